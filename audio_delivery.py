@@ -0,0 +1,236 @@
+"""How audio gets from the bucket to the student's browser.
+
+"presigned" (the default) gives the browser a short-lived presigned GET URL, so the audio
+goes straight from S3 and the app server never handles it. "stream" is for deployments that
+can't hand out presigned URLs: AudioServer, a small HTTP server in the app process, serves
+the audio from the shared S3 object cache, or streams it from S3 when it is too big to cache,
+with byte ranges so the browser can start playing and seek straight away. "inline" is the
+older way: the app reads the MP3 and embeds it in the page as a base64 data URI.
+"""
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from botocore.exceptions import ClientError
+
+AUDIO_DELIVERY_MODES = ("presigned", "stream", "inline")
+# Lifetime of a presigned URL, and how much of it must be left for a cached URL to be reused
+PRESIGNED_URL_EXPIRES_SECONDS = 60 * 60
+PRESIGNED_URL_MIN_REMAINING_SECONDS = 15 * 60
+PRESIGNED_URL_CACHE_MAX_KEYS = 20000
+
+
+class PresignedUrlCache:
+    """Presigned GET URLs per key, reused until they get close to expiring
+
+    Handing out the same URL again lets the browser answer repeat plays from its own cache.
+    """
+
+    def __init__(self, s3, bucket, expires_seconds=PRESIGNED_URL_EXPIRES_SECONDS,
+                 min_remaining_seconds=PRESIGNED_URL_MIN_REMAINING_SECONDS, max_keys=PRESIGNED_URL_CACHE_MAX_KEYS,
+                 content_type="audio/mpeg"):
+        self.s3 = s3
+        self.bucket = bucket
+        self.expires_seconds = expires_seconds
+        self.min_remaining_seconds = min_remaining_seconds
+        self.max_keys = max_keys
+        self.content_type = content_type
+        self._urls = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def url(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._urls.get(key)
+            if entry is not None and entry[1] - now >= self.min_remaining_seconds:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Signing is local - no request to S3
+        url = self.s3.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': self.bucket,
+                'Key': key,
+                'ResponseContentType': self.content_type,
+                'ResponseCacheControl': f"private, max-age={self.expires_seconds}",
+            },
+            ExpiresIn=self.expires_seconds,
+        )
+        with self._lock:
+            if len(self._urls) >= self.max_keys:
+                # Drop the URLs too close to expiring first, then everything if that is not enough
+                self._urls = {k: v for k, v in self._urls.items() if v[1] - now >= self.min_remaining_seconds}
+                if len(self._urls) >= self.max_keys:
+                    self._urls.clear()
+            self._urls[key] = (url, now + self.expires_seconds)
+        return url
+
+    def stats(self):
+        with self._lock:
+            return {"keys": len(self._urls), "hits": self.hits, "misses": self.misses}
+
+
+# AudioServer URLs stay the same for an hour at a time and then work for at least another hour
+AUDIO_URL_PERIOD_SECONDS = 60 * 60
+AUDIO_STREAM_CHUNK_BYTES = 64 * 1024
+AUDIO_PATH_PREFIX = "/audio/"
+
+
+def parse_range(header, size):
+    """Return the (first, last) byte of a "bytes=first-last" Range header, or None for the whole file
+
+    Raises ValueError when the range can't be satisfied. Several ranges at once are answered
+    with the whole file, which HTTP allows.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if not first:
+            # The last N bytes
+            length = int(last)
+            if length <= 0:
+                raise ValueError(header)
+            return max(size - length, 0), size - 1
+        first = int(first)
+        last = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        raise ValueError(header)
+    if first >= size or first > last:
+        raise ValueError(header)
+    return first, last
+
+
+class _AudioRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.audio_server.handle(self, send_body=True)
+
+    def do_HEAD(self):
+        self.server.audio_server.handle(self, send_body=False)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class AudioServer:
+    """Serves audio from the bucket over HTTP, at signed URLs only this process hands out
+
+    Files small enough for the S3 object cache are served from it; bigger ones are streamed
+    from S3, reading only the requested range. Responses carry ETag and Cache-Control, and
+    answer Range requests with 206 so playback starts before the whole file has arrived.
+    """
+
+    def __init__(self, s3, bucket, cache=None, public_url="http://localhost:8502", host="0.0.0.0", port=8502,
+                 secret=None):
+        self.s3 = s3
+        self.bucket = bucket
+        self.cache = cache
+        self.public_url = public_url.rstrip("/")
+        self.host = host
+        self.port = port
+        self._secret = (secret or secrets.token_urlsafe(32)).encode("utf-8")
+        self._httpd = None
+
+    def _signature(self, key, expires):
+        return hmac.new(self._secret, f"{key}\n{expires}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def url(self, key):
+        """Return a signed URL for the key; the same URL is handed out for an hour, so browsers cache it"""
+        expires = (int(time.time()) // AUDIO_URL_PERIOD_SECONDS + 2) * AUDIO_URL_PERIOD_SECONDS
+        return f"{self.public_url}{AUDIO_PATH_PREFIX}{quote(key)}?exp={expires}&sig={self._signature(key, expires)}"
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _AudioRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.audio_server = self
+        threading.Thread(target=self._httpd.serve_forever, name="audio-server", daemon=True).start()
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def _download(self, key):
+        try:
+            return self.s3.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except ClientError:
+            return None
+
+    def _send_status(self, request, status, headers=()):
+        request.send_response(status)
+        for name, value in headers:
+            request.send_header(name, value)
+        request.send_header("Content-Length", "0")
+        request.end_headers()
+
+    def handle(self, request, send_body=True):
+        url = urlsplit(request.path)
+        if not url.path.startswith(AUDIO_PATH_PREFIX):
+            return self._send_status(request, 404)
+        key = unquote(url.path[len(AUDIO_PATH_PREFIX):])
+        query = parse_qs(url.query)
+        try:
+            expires = int(query["exp"][0])
+            signature = query["sig"][0]
+        except (KeyError, ValueError):
+            return self._send_status(request, 403)
+        if expires < time.time() or not hmac.compare_digest(signature, self._signature(key, expires)):
+            return self._send_status(request, 403)
+
+        content = self.cache.get(key) if self.cache is not None else None
+        if content is not None:
+            size, etag = len(content), f'"{hashlib.md5(content).hexdigest()}"'
+        else:
+            try:
+                head = self.s3.head_object(Bucket=self.bucket, Key=key)
+            except ClientError:
+                return self._send_status(request, 404)
+            size, etag = head["ContentLength"], head["ETag"]
+            if self.cache is not None and size < self.cache.max_object_bytes:
+                content = self.cache.get_or_load(key, lambda: self._download(key))
+                if content is None:
+                    return self._send_status(request, 404)
+
+        headers = [("ETag", etag), ("Cache-Control", f"private, max-age={AUDIO_URL_PERIOD_SECONDS}"),
+                   ("Accept-Ranges", "bytes")]
+        if request.headers.get("If-None-Match") == etag:
+            return self._send_status(request, 304, headers)
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size)
+        except ValueError:
+            return self._send_status(request, 416, headers + [("Content-Range", f"bytes */{size}")])
+        first, last = byte_range or (0, size - 1)
+
+        request.send_response(206 if byte_range else 200)
+        for name, value in headers:
+            request.send_header(name, value)
+        request.send_header("Content-Type", "audio/mpeg")
+        request.send_header("Content-Length", str(last - first + 1))
+        if byte_range:
+            request.send_header("Content-Range", f"bytes {first}-{last}/{size}")
+        request.end_headers()
+        if not send_body or size == 0:
+            return
+        try:
+            if content is not None:
+                for start in range(first, last + 1, AUDIO_STREAM_CHUNK_BYTES):
+                    request.wfile.write(content[start:min(start + AUDIO_STREAM_CHUNK_BYTES, last + 1)])
+            else:
+                # Too big to cache - pass S3's bytes on as they arrive
+                response = self.s3.get_object(Bucket=self.bucket, Key=key, Range=f"bytes={first}-{last}")
+                for chunk in response["Body"].iter_chunks(AUDIO_STREAM_CHUNK_BYTES):
+                    request.wfile.write(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            # The browser stopped reading, usually to seek elsewhere
+            pass
@@ -0,0 +1,185 @@
+"""Student passwords, compiled into one object per group.
+
+Each group has Summer_Activities/<group>/credentials.json:
+    {
+        "version": "<hash of the passwords>",
+        "generated_at": "2024-06-10 10:00:00",
+        "group": "<group folder>",
+        "passwords": {"<student name, lowercased>": "<password>"}
+    }
+manage_roster.py credentials compiles it from the files groups were set up with:
+<group>_passwords.txt, one <student>_passwords.txt per student, and passwords.json. Until
+it has been run for a group, the app compiles those files in memory instead.
+
+manage_roster.py collects and compiles with the same functions the app falls back on, so a
+built credentials.json accepts exactly the passwords the old files did.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from roster import BASE_PREFIX
+from storage_codec import decode_json, encode_json
+
+CREDENTIALS_FILENAME = "credentials.json"
+# How long a process keeps a group's credentials when the roster does not say which version is current
+CREDENTIALS_MAX_AGE_SECONDS = 15 * 60
+
+
+def credentials_key(group, base_prefix=BASE_PREFIX):
+    return f"{base_prefix}{group}/{CREDENTIALS_FILENAME}"
+
+
+def credentials_version(passwords):
+    """Content hash of a group's passwords - changes whenever one is added, removed or changed"""
+    canonical = json.dumps(passwords, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(canonical).hexdigest()[:16]
+
+
+def parse_group_passwords(text):
+    """Return {student: password} from a <group>_passwords.txt listing, one "student: password" per line"""
+    passwords = {}
+    for line in text.strip().split('\n'):
+        if ':' in line and not line.startswith('=') and not line.startswith('GROUP'):
+            parts = line.split(':')
+            if len(parts) == 2:
+                passwords[parts[0].strip()] = parts[1].strip()
+    return passwords
+
+
+def _read(s3, bucket, key):
+    try:
+        return s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+    except ClientError:
+        return None
+
+
+def collect_legacy_passwords(s3, bucket, group, base_prefix=BASE_PREFIX):
+    """Return {student: password} from a group's password files, as the login page used to read them
+
+    The group listing comes first, then the per-student files, which win over it. passwords.json
+    is only used when neither has any passwords.
+    """
+    group_prefix = f"{base_prefix}{group}/"
+    group_file = f"{group}_passwords.txt"
+    passwords = {}
+
+    content = _read(s3, bucket, f"{group_prefix}{group_file}")
+    if content:
+        passwords.update(parse_group_passwords(content.decode('utf-8')))
+
+    # Only the files directly in the group folder - the student folders hold all the audio
+    student_files = []
+    try:
+        paginator = s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket, Prefix=group_prefix, Delimiter='/'):
+            for obj in page.get('Contents', []):
+                filename = obj['Key'][len(group_prefix):]
+                if filename.endswith('_passwords.txt') and filename != group_file:
+                    student_files.append(filename)
+    except ClientError:
+        pass
+    for filename in student_files:
+        content = _read(s3, bucket, f"{group_prefix}{filename}")
+        if content:
+            passwords[filename.replace('_passwords.txt', '')] = content.decode('utf-8').strip()
+
+    if not passwords:
+        content = _read(s3, bucket, f"{group_prefix}passwords.json")
+        if content:
+            try:
+                passwords = json.loads(content.decode('utf-8'))
+            except json.JSONDecodeError:
+                pass
+    return passwords
+
+
+def compile_credentials(group, passwords):
+    """Index {student: password} by lowercased name, later entries winning"""
+    index = {}
+    for student, password in passwords.items():
+        index[student.lower()] = password
+    index = dict(sorted(index.items()))
+    return {
+        "version": credentials_version(index),
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "group": group,
+        "passwords": index,
+    }
+
+
+def find_password(credentials, student):
+    """Return the student's password, matching the name in any case, or None"""
+    return credentials.get("passwords", {}).get(student.lower())
+
+
+def read_credentials(s3, bucket, group, base_prefix=BASE_PREFIX):
+    """Return a group's compiled credentials, or None when they have not been built"""
+    try:
+        response = s3.get_object(Bucket=bucket, Key=credentials_key(group, base_prefix))
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return None
+        raise
+    return decode_json(response['Body'].read())
+
+
+def write_credentials(s3, bucket, credentials, base_prefix=BASE_PREFIX):
+    body, put_args = encode_json(credentials)
+    s3.put_object(Bucket=bucket, Key=credentials_key(credentials["group"], base_prefix), Body=body, **put_args)
+    return len(body)
+
+
+class CredentialStore:
+    """Compiled credentials per group, loaded once per process and shared by every session
+
+    get() takes the version the roster lists for the group and reloads only when it differs,
+    so a login costs at most one GET. Without a version, credentials are reloaded once they
+    are older than max_age_seconds.
+    """
+
+    def __init__(self, s3, bucket, base_prefix=BASE_PREFIX, max_age_seconds=CREDENTIALS_MAX_AGE_SECONDS):
+        self.s3 = s3
+        self.bucket = bucket
+        self.base_prefix = base_prefix
+        self.max_age_seconds = max_age_seconds
+        self._groups = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _cached(self, group, version):
+        with self._lock:
+            entry = self._groups.get(group)
+        if entry is None:
+            return None
+        credentials, loaded_at = entry
+        if version is not None:
+            return credentials if credentials.get("version") == version else None
+        return credentials if time.time() - loaded_at < self.max_age_seconds else None
+
+    def get(self, group, version=None):
+        credentials = self._cached(group, version)
+        if credentials is not None:
+            return credentials
+        with self._load_lock:
+            # Another session may have loaded them while this one waited
+            credentials = self._cached(group, version)
+            if credentials is None:
+                credentials = read_credentials(self.s3, self.bucket, group, self.base_prefix)
+                if credentials is None:
+                    # Not built yet - compile the password files in memory
+                    passwords = collect_legacy_passwords(self.s3, self.bucket, group, self.base_prefix)
+                    credentials = compile_credentials(group, passwords)
+                with self._lock:
+                    self._groups[group] = (credentials, time.time())
+        return credentials
+
+    def invalidate(self, group=None):
+        with self._lock:
+            if group is None:
+                self._groups.clear()
+            else:
+                self._groups.pop(group, None)
@@ -0,0 +1,96 @@
+"""Build the roster manifest and the compiled group credentials the login page reads.
+
+Usage:
+    python manage_roster.py build [--dry-run]
+    python manage_roster.py credentials [--groups Group1 Group2] [--dry-run]
+
+Run build after adding, removing or moving student folders, and credentials after changing
+a group's password files. Uses the standard AWS credential
+chain (environment variables, ~/.aws, ...).
+"""
+import argparse
+
+import boto3
+
+from credentials import (collect_legacy_passwords, compile_credentials, credentials_key, read_credentials,
+                         write_credentials)
+from roster import BASE_PREFIX, ROSTER_KEY, list_folders, list_students, make_roster, read_roster, write_roster
+
+BUCKET_NAME = "summer-activities-streamli-app"
+BUCKET_REGION = "eu-north-1"
+
+
+def run_build(s3, args):
+    students = list_students(s3, BUCKET_NAME)
+    current = read_roster(s3, BUCKET_NAME)
+    # Credential versions are kept up to date by the credentials command
+    roster = make_roster(students, (current or {}).get("credentials"))
+    groups = sorted(set(students.values()))
+    print(f"{len(students)} students in {len(groups)} groups: {', '.join(groups)}")
+    if current and current.get("version") == roster["version"]:
+        print(f"{ROSTER_KEY} is up to date (version {roster['version']})")
+        return
+    if current:
+        added = sorted(set(students) - set(current.get("students", {})))
+        removed = sorted(set(current.get("students", {})) - set(students))
+        print(f"added: {', '.join(added) or '-'}; removed: {', '.join(removed) or '-'}")
+    if args.dry_run:
+        print(f"would write {ROSTER_KEY} version {roster['version']}")
+        return
+    size = write_roster(s3, BUCKET_NAME, roster)
+    print(f"wrote {ROSTER_KEY} version {roster['version']} ({size} bytes)")
+
+
+def run_credentials(s3, args):
+    groups = args.groups or [group for group in list_folders(s3, BUCKET_NAME, BASE_PREFIX) if group]
+    versions = {}
+    for group in groups:
+        passwords = collect_legacy_passwords(s3, BUCKET_NAME, group)
+        if not passwords:
+            print(f"{group}: no password files, skipped")
+            continue
+        credentials = compile_credentials(group, passwords)
+        versions[group] = credentials["version"]
+        current = read_credentials(s3, BUCKET_NAME, group)
+        if current and current.get("version") == credentials["version"]:
+            print(f"{group}: {len(credentials['passwords'])} students, up to date (version {credentials['version']})")
+            continue
+        if args.dry_run:
+            print(f"{group}: {len(credentials['passwords'])} students, would write version {credentials['version']}")
+            continue
+        size = write_credentials(s3, BUCKET_NAME, credentials)
+        print(f"{group}: {len(credentials['passwords'])} students, wrote {credentials_key(group)} "
+              f"version {credentials['version']} ({size} bytes)")
+
+    # The app reloads a group's credentials when the roster lists a new version
+    roster = read_roster(s3, BUCKET_NAME)
+    if roster is None:
+        print(f"no {ROSTER_KEY} yet - run build so the app picks up credential changes straight away")
+        return
+    credential_versions = dict(roster.get("credentials", {}), **versions)
+    if credential_versions == roster.get("credentials") or args.dry_run:
+        return
+    size = write_roster(s3, BUCKET_NAME, make_roster(roster.get("students", {}), credential_versions))
+    print(f"updated the credential versions in {ROSTER_KEY} ({size} bytes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="regenerate the roster manifest from the bucket")
+    build_parser.add_argument("--dry-run", action="store_true", help="report without writing")
+    build_parser.set_defaults(run=run_build)
+
+    credentials_parser = subparsers.add_parser("credentials", help="compile each group's password files into one object")
+    credentials_parser.add_argument("--groups", nargs="+", help="only these group folders (default: all)")
+    credentials_parser.add_argument("--dry-run", action="store_true", help="report without writing")
+    credentials_parser.set_defaults(run=run_credentials)
+
+    args = parser.parse_args()
+    s3 = boto3.client('s3', region_name=BUCKET_REGION)
+    args.run(s3, args)
+
+
+if __name__ == "__main__":
+    main()
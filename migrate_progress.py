@@ -0,0 +1,255 @@
+"""Maintenance migrations for the progress files and activity packs in the activities bucket.
+
+Usage:
+    python migrate_progress.py debloat [--dry-run] [--group Group1]
+    python migrate_progress.py compress [--dry-run] [--group Group1]
+    python migrate_progress.py upgrade [--dry-run] [--group Group1] [--workers 16]
+
+Uses the standard AWS credential chain (environment variables, ~/.aws, ...).
+"""
+import argparse
+import copy
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.exceptions import ClientError
+
+from progress_store import PROGRESS_SCHEMA, is_legacy_day, upgrade_day, upgrade_progress
+from storage_codec import decode_json, encode_json, is_compressed
+
+BUCKET_NAME = "summer-activities-streamli-app"
+BUCKET_REGION = "eu-north-1"
+BASE_PREFIX = "Summer_Activities/"
+
+
+def list_prefixes(s3, prefix):
+    """Return the sub-folders directly under prefix"""
+    prefixes = []
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=prefix, Delimiter='/'):
+        for common_prefix in page.get('CommonPrefixes', []):
+            prefixes.append(common_prefix['Prefix'])
+    return prefixes
+
+
+def iter_student_prefixes(s3, group=None):
+    """Yield "Summer_Activities/<group>/<student>" for every student folder"""
+    if group:
+        group_prefixes = [f"{BASE_PREFIX}{group}/"]
+    else:
+        group_prefixes = list_prefixes(s3, BASE_PREFIX)
+    for group_prefix in group_prefixes:
+        for student_prefix in list_prefixes(s3, group_prefix):
+            yield student_prefix.rstrip('/')
+
+
+def answer_owner(answer_key):
+    """Return the day an "answer_<day>_<index>" key belongs to, or None"""
+    if not answer_key.startswith("answer_") or "_" not in answer_key[len("answer_"):]:
+        return None
+    return answer_key[len("answer_"):].rsplit("_", 1)[0]
+
+
+def _stamp(day_data, answer_key):
+    stamp = day_data.get("answer_meta", {}).get(answer_key)
+    return (stamp[0], stamp[1]) if stamp else (0, "")
+
+
+def debloat_progress(progress):
+    """Remove answers stored under a day they don't belong to
+
+    Older Complete Day / Logout saves copied every day's answers into the day
+    being saved. A copy is moved to its own day when that day is missing the
+    answer or holds an older write of it, otherwise it is dropped.
+    Returns (cleaned progress, number of copies removed).
+    """
+    cleaned = copy.deepcopy(progress)
+    removed = 0
+    for day, data in progress.items():
+        # Current schema days only ever hold their own answers
+        if day.startswith("_") or not is_legacy_day(data):
+            continue
+        for answer_key, value in data.get("answers", {}).items():
+            owner = answer_owner(answer_key)
+            if owner is None or owner == day:
+                continue
+            removed += 1
+            del cleaned[day]["answers"][answer_key]
+            cleaned[day].get("answer_meta", {}).pop(answer_key, None)
+
+            owner_data = cleaned.setdefault(owner, {"answers": {}, "completed": False})
+            owner_answers = owner_data.setdefault("answers", {})
+            if answer_key not in owner_answers or _stamp(data, answer_key) > _stamp(owner_data, answer_key):
+                owner_answers[answer_key] = value
+                if answer_key in data.get("answer_meta", {}):
+                    owner_data.setdefault("answer_meta", {})[answer_key] = data["answer_meta"][answer_key]
+    return cleaned, removed
+
+
+def debloat_student(s3, student_prefix, dry_run=False):
+    """De-bloat one student's progress.json. Returns (bytes before, bytes after, copies removed)"""
+    progress_key = f"{student_prefix}/progress.json"
+    try:
+        response = s3.get_object(Bucket=BUCKET_NAME, Key=progress_key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return 0, 0, 0
+        raise
+    content = response['Body'].read()
+    progress = decode_json(content)
+    cleaned, removed = debloat_progress(progress)
+    if not removed:
+        return len(content), len(content), 0
+
+    body, put_args = encode_json(cleaned)
+    if not dry_run:
+        # Don't overwrite a save the student made while we were working
+        s3.put_object(
+            Bucket=BUCKET_NAME,
+            Key=progress_key,
+            Body=body,
+            IfMatch=response['ETag'],
+            **put_args
+        )
+    return len(content), len(body), removed
+
+
+def run_debloat(s3, args):
+    total_before = total_after = total_removed = changed = 0
+    for student_prefix in iter_student_prefixes(s3, args.group):
+        try:
+            before, after, removed = debloat_student(s3, student_prefix, dry_run=args.dry_run)
+        except ClientError as e:
+            print(f"{student_prefix}: skipped ({e.response.get('Error', {}).get('Code')}) - run again later")
+            continue
+        total_before += before
+        total_after += after
+        total_removed += removed
+        if removed:
+            changed += 1
+            print(f"{student_prefix}: removed {removed} copied answers, {before} -> {after} bytes")
+    action = "would shrink" if args.dry_run else "shrank"
+    print(f"{changed} progress files {action} from {total_before} to {total_after} bytes "
+          f"({total_removed} copied answers removed)")
+
+
+def is_stored_json(key, student_prefix):
+    """True for the activity packs and progress files under a student folder"""
+    relative_key = key[len(student_prefix) + 1:]
+    return (relative_key.endswith("/activity_pack.json")
+            or relative_key == "progress.json"
+            or (relative_key.startswith("progress/") and relative_key.endswith(".json")))
+
+
+def compress_object(s3, key, dry_run=False):
+    """Rewrite one plain JSON object as compressed JSON. Returns (bytes before, bytes after)"""
+    response = s3.get_object(Bucket=BUCKET_NAME, Key=key)
+    content = response['Body'].read()
+    if not content or is_compressed(content):
+        return len(content), len(content)
+    body, put_args = encode_json(decode_json(content))
+    if not dry_run:
+        s3.put_object(Bucket=BUCKET_NAME, Key=key, Body=body, IfMatch=response['ETag'], **put_args)
+    return len(content), len(body)
+
+
+def run_compress(s3, args):
+    total_before = total_after = changed = 0
+    paginator = s3.get_paginator('list_objects_v2')
+    for student_prefix in iter_student_prefixes(s3, args.group):
+        for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=student_prefix + "/"):
+            for obj in page.get('Contents', []):
+                if not is_stored_json(obj['Key'], student_prefix):
+                    continue
+                try:
+                    before, after = compress_object(s3, obj['Key'], dry_run=args.dry_run)
+                except ClientError as e:
+                    print(f"{obj['Key']}: skipped ({e.response.get('Error', {}).get('Code')}) - run again later")
+                    continue
+                total_before += before
+                total_after += after
+                if after < before:
+                    changed += 1
+    action = "would shrink" if args.dry_run else "shrank"
+    print(f"{changed} JSON files {action} from {total_before} to {total_after} bytes")
+
+
+def upgrade_object(s3, key, upgrade, dry_run=False):
+    """Rewrite one progress object in the current schema. Returns True if it needed it"""
+    try:
+        response = s3.get_object(Bucket=BUCKET_NAME, Key=key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return False
+        raise
+    data = decode_json(response['Body'].read())
+    upgraded = upgrade(data)
+    if upgraded is data:
+        return False
+    if not dry_run:
+        body, put_args = encode_json(upgraded)
+        s3.put_object(Bucket=BUCKET_NAME, Key=key, Body=body, IfMatch=response['ETag'], **put_args)
+    return True
+
+
+def upgrade_student(s3, student_prefix, dry_run=False):
+    """Upgrade progress.json and the per-day progress objects of one student. Returns the number upgraded"""
+    upgraded = int(upgrade_object(s3, f"{student_prefix}/progress.json", upgrade_progress, dry_run))
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=f"{student_prefix}/progress/"):
+        for obj in page.get('Contents', []):
+            day = obj['Key'].rsplit('/', 1)[-1][:-len(".json")]
+            if not obj['Key'].endswith(".json") or day == "index":
+                continue
+            upgraded += upgrade_object(s3, obj['Key'], lambda data, day=day: upgrade_day(day, data), dry_run)
+    return upgraded
+
+
+def run_upgrade(s3, args):
+    def upgrade(student_prefix):
+        try:
+            return student_prefix, upgrade_student(s3, student_prefix, dry_run=args.dry_run), None
+        except ClientError as e:
+            return student_prefix, 0, e.response.get('Error', {}).get('Code')
+
+    total = students = failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for student_prefix, upgraded, error in executor.map(upgrade, iter_student_prefixes(s3, args.group)):
+            if error:
+                failed += 1
+                print(f"{student_prefix}: skipped ({error}) - run again later")
+            elif upgraded:
+                students += 1
+                total += upgraded
+                print(f"{student_prefix}: {upgraded} progress files")
+    action = "would upgrade" if args.dry_run else "upgraded"
+    print(f"{action} {total} progress files of {students} students to schema {PROGRESS_SCHEMA}, {failed} skipped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    debloat_parser = subparsers.add_parser("debloat", help="move copied answers back to their own day")
+    debloat_parser.add_argument("--group", help="only migrate this group folder")
+    debloat_parser.add_argument("--dry-run", action="store_true", help="report without writing")
+    debloat_parser.set_defaults(run=run_debloat)
+
+    compress_parser = subparsers.add_parser("compress", help="rewrite activity packs and progress files as gzipped JSON")
+    compress_parser.add_argument("--group", help="only migrate this group folder")
+    compress_parser.add_argument("--dry-run", action="store_true", help="report without writing")
+    compress_parser.set_defaults(run=run_compress)
+
+    upgrade_parser = subparsers.add_parser("upgrade", help=f"convert progress files to schema {PROGRESS_SCHEMA}")
+    upgrade_parser.add_argument("--group", help="only migrate this group folder")
+    upgrade_parser.add_argument("--dry-run", action="store_true", help="report without writing")
+    upgrade_parser.add_argument("--workers", type=int, default=16, help="students converted in parallel")
+    upgrade_parser.set_defaults(run=run_upgrade)
+
+    args = parser.parse_args()
+    s3 = boto3.client('s3', region_name=BUCKET_REGION)
+    args.run(s3, args)
+
+
+if __name__ == "__main__":
+    main()
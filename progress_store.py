@@ -0,0 +1,933 @@
+"""Student progress persistence for the activities app.
+
+Nothing in here touches Streamlit, so saves can run on background threads and
+maintenance scripts can reuse the same merge rules.
+
+A progress document looks like:
+    {
+        "_schema": 2,
+        "_current_day": "day3",
+        "_current_day_stamp": [1718000000.0, "<session id>"],
+        "day1": {
+            "answers": ["...", null, "..."],
+            "answer_meta": [[1718000000.0, "<session id>"], null, [1718000050.0, "<session id>"]],
+            "completed": true,
+            "last_updated": "2024-06-10 10:00:00",
+            "score": {"correct": 9, "total": 10, "activities": {"activity_1": {...}}}
+        }
+    }
+
+answers is indexed by the question's position in the day (null = not answered yet) and
+answer_meta holds the stamp of the write that produced each answer. Schema 1 documents keyed
+both by "answer_<day>_<index>" strings; upgrade_progress converts them and merge_progress
+accepts either.
+
+In "sharded" mode the same document is split over <student>/progress/index.json, which holds
+everything except the answers (see progress_index), and one <student>/progress/<day>.json per day.
+"""
+import copy
+import json
+import queue
+import random
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+from botocore.exceptions import ClientError
+
+from storage_codec import decode_json, encode_json
+
+# How progress is written, chosen per deployment:
+#   overwrite          progress.json is replaced with what this process knows, without reading it first
+#   merge              progress.json is read, merged and written on every save
+#   conditional_write  progress.json is merged and written with ETag-conditional PUTs ("snapshot")
+#   delta_log          each save is a new small object, folded into progress.json in the background
+#   sharded            an index plus one object per day, each written with conditional PUTs
+PROGRESS_STRATEGIES = ("overwrite", "merge", "conditional_write", "delta_log", "sharded")
+# Strategies that keep the whole document in progress.json
+SINGLE_FILE_STRATEGIES = ("overwrite", "merge", "conditional_write")
+
+# Version of the progress document layout, stored as "_schema"
+PROGRESS_SCHEMA = 2
+# Conditional writes are retried this many times before the save is reported as failed
+SAVE_ATTEMPTS = 3
+# Fold the delta log into progress.json once this many deltas are waiting
+LOG_COMPACT_AFTER = 25
+# Deltas younger than this are left for the next compaction, in case an older write is still landing
+LOG_SETTLE_SECONDS = 60
+
+
+class ProgressConflictError(Exception):
+    """Raised when a conditional save keeps losing to writes from other sessions"""
+
+
+class ProgressStats:
+    """Thread-safe counters for progress saves"""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+def is_missing(error):
+    return error.response.get('Error', {}).get('Code') in ('NoSuchKey', '404')
+
+
+def is_precondition_failure(error):
+    code = error.response.get('Error', {}).get('Code', '')
+    status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    return code in ('PreconditionFailed', 'ConditionalRequestConflict') or status in (409, 412)
+
+
+def get_slot(values, index):
+    """values[index], or None past the end of the list"""
+    return values[index] if index < len(values) else None
+
+
+def set_slot(values, index, value):
+    """Set values[index], growing the list with None as needed"""
+    if index >= len(values):
+        values.extend([None] * (index + 1 - len(values)))
+    values[index] = value
+
+
+def write_stamp(day_data, index):
+    """Return (timestamp, session_id) of the write that produced an answer - (0, "") if unknown"""
+    stamp = get_slot(day_data.get("answer_meta") or [], index)
+    return (stamp[0], stamp[1]) if stamp else (0, "")
+
+
+def parse_answer_key(answer_key):
+    """Split a schema 1 "answer_<day>_<index>" key into (day, index), or None"""
+    if not answer_key.startswith("answer_"):
+        return None
+    day, _, index = answer_key[len("answer_"):].rpartition("_")
+    if not day or not index.isdigit():
+        return None
+    return day, int(index)
+
+
+def is_legacy_day(data):
+    return isinstance(data, dict) and isinstance(data.get("answers"), dict)
+
+
+def upgrade_progress(progress):
+    """Return the progress document in the current schema
+
+    Schema 1 answers move into their own day's list. Some old days also hold copies of other
+    days' answers; a copy only replaces an answer when it is a later write of it. Documents
+    already in the current schema are returned as they are.
+    """
+    if not progress:
+        return progress
+    legacy_days = {day: data for day, data in progress.items() if not day.startswith("_") and is_legacy_day(data)}
+    if not legacy_days:
+        return progress
+
+    upgraded = copy.deepcopy({day: data for day, data in progress.items() if day not in legacy_days})
+    for day, data in legacy_days.items():
+        upgraded[day] = {key: copy.deepcopy(value) for key, value in data.items() if key not in ("answers", "answer_meta")}
+        upgraded[day].update(answers=[], answer_meta=[])
+    # Each day's own answers first, then copies found under other days
+    for own_day in (True, False):
+        for day, data in legacy_days.items():
+            legacy_meta = data.get("answer_meta") or {}
+            for answer_key, value in data["answers"].items():
+                parsed = parse_answer_key(answer_key)
+                if parsed is None or (parsed[0] == day) != own_day:
+                    continue
+                owner, index = parsed
+                stamp = legacy_meta.get(answer_key)
+                owner_day = upgraded.setdefault(owner, {"answers": [], "answer_meta": [], "completed": False})
+                owner_day.setdefault("answers", [])
+                owner_day.setdefault("answer_meta", [])
+                if get_slot(owner_day["answers"], index) is not None:
+                    if own_day or not stamp or tuple(stamp) <= write_stamp(owner_day, index):
+                        continue
+                set_slot(owner_day["answers"], index, value)
+                set_slot(owner_day["answer_meta"], index, list(stamp) if stamp else None)
+    upgraded["_schema"] = PROGRESS_SCHEMA
+    return upgraded
+
+
+def upgrade_day(day, data):
+    """Return one day's progress in the current schema, keeping only that day's own answers"""
+    if not is_legacy_day(data):
+        return data
+    return upgrade_progress({day: data})[day]
+
+
+def merge_progress(existing_progress, progress_data):
+    """Merge new progress data into a copy of the existing progress
+
+    Each answer keeps whichever write is latest by (timestamp, session id), so two tabs or
+    devices end up with the same result whatever order their saves arrive in. On equal stamps
+    (old files without stamps) the new data wins, as before. Either side may still be in
+    schema 1; the result is always in the current schema.
+    """
+    existing_progress = upgrade_progress(existing_progress)
+    progress_data = upgrade_progress(progress_data)
+    merged_progress = copy.deepcopy(existing_progress) if existing_progress else {}
+    if "_schema" in progress_data:
+        merged_progress["_schema"] = max(merged_progress.get("_schema", 0), progress_data["_schema"])
+
+    for day, data in progress_data.items():
+        if day.startswith("_"):
+            continue
+        if day not in merged_progress:
+            merged_progress[day] = copy.deepcopy(data)
+            continue
+
+        # Merge the day's data answer by answer
+        merged_day = merged_progress[day]
+        answers = data.get("answers") or []
+        if any(value is not None for value in answers):
+            merged_answers = merged_day.setdefault("answers", [])
+            merged_meta = merged_day.setdefault("answer_meta", [])
+        for index, value in enumerate(answers):
+            if value is None:
+                continue
+            stamp = write_stamp(data, index)
+            if get_slot(merged_answers, index) is not None and stamp < write_stamp(merged_day, index):
+                continue
+            set_slot(merged_answers, index, value)
+            set_slot(merged_meta, index, list(stamp) if stamp[0] else None)
+
+        # Completion never goes back; keep the latest timestamp
+        if data.get("completed", False):
+            merged_day["completed"] = True
+        if data.get("last_updated", "") > merged_day.get("last_updated", ""):
+            merged_day["last_updated"] = data["last_updated"]
+        # Scores are worked out from the answers when a day is completed; the latest one counts
+        if data.get("score") is not None:
+            merged_day["score"] = copy.deepcopy(data["score"])
+
+    # Current day - the latest change wins
+    if "_current_day" in progress_data:
+        stamp = tuple(progress_data.get("_current_day_stamp") or (0, ""))
+        merged_stamp = tuple(merged_progress.get("_current_day_stamp") or (0, ""))
+        if stamp >= merged_stamp:
+            merged_progress["_current_day"] = progress_data["_current_day"]
+            if stamp[0]:
+                merged_progress["_current_day_stamp"] = list(stamp)
+
+    return merged_progress
+
+
+def progress_index(progress):
+    """Return the part of a progress document kept in the sharded index: the current day and
+    each day's completion and score, without any answers"""
+    index = {key: progress[key] for key in ("_schema", "_current_day", "_current_day_stamp") if key in progress}
+    for day, data in progress.items():
+        if not day.startswith("_") and isinstance(data, dict):
+            index[day] = {"completed": data.get("completed", False)}
+            if data.get("score") is not None:
+                index[day]["score"] = data["score"]
+    return index
+
+
+class _StudentState:
+    """What the store last saw of one student's progress in S3"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.progress = None
+        self.etag = None
+        self.version = 0
+        self.log_seen = ""
+        self.log_tail = 0
+        self.log_seq = 0
+        # Sharded mode: (data, etag) of the index and of each day read so far
+        self.index = None
+        self.days = {}
+
+
+class ProgressStore:
+    """Reads and writes student progress in S3; safe to share between threads
+
+    mode is one of PROGRESS_STRATEGIES. The single file strategies keep everything in
+    <student>/progress.json and differ in how a save treats writes made by other processes:
+    "overwrite" ignores them, "merge" reads them first, "conditional_write" also catches the
+    ones that land in between. mode "delta_log" appends one small object per save under
+    <student>/progress_log/ and folds them into progress.json in the background.
+    mode "sharded" keeps a small index plus one object per day under <student>/progress/;
+    loading reads the index and the current day, other days are read by load_day on first use.
+    """
+
+    def __init__(self, s3, bucket, mode="conditional_write", stats=None):
+        # "snapshot" was the name of conditional_write before the other single file strategies
+        mode = "conditional_write" if mode == "snapshot" else mode
+        if mode not in PROGRESS_STRATEGIES:
+            raise ValueError(f"Unknown progress storage mode {mode!r}")
+        self.s3 = s3
+        self.bucket = bucket
+        self.mode = mode
+        self.stats = stats or ProgressStats()
+        # Names this process's deltas, so it can skip them when reading other writers' changes
+        self.writer_id = uuid.uuid4().hex[:12]
+        self._students = {}
+        self._compacting = set()
+        self._lock = threading.Lock()
+
+    def _state(self, student_s3_prefix):
+        with self._lock:
+            state = self._students.get(student_s3_prefix)
+            if state is None:
+                state = self._students[student_s3_prefix] = _StudentState()
+            return state
+
+    def _progress_key(self, student_s3_prefix):
+        return f"{student_s3_prefix}/progress.json"
+
+    def _log_prefix(self, student_s3_prefix):
+        return f"{student_s3_prefix}/progress_log/"
+
+    def _index_key(self, student_s3_prefix):
+        return f"{student_s3_prefix}/progress/index.json"
+
+    def _day_key(self, student_s3_prefix, day):
+        return f"{student_s3_prefix}/progress/{day}.json"
+
+    def _read_object(self, key):
+        """Read a JSON object and return (data, etag), or (None, None) when it does not exist"""
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if is_missing(e):
+                return None, None
+            raise
+        data = decode_json(response['Body'].read(), self.stats)
+        return data, response.get('ETag')
+
+    # Reading
+
+    def load(self, student_s3_prefix):
+        """Read the student's progress from S3; returns None when there is none yet"""
+        state = self._state(student_s3_prefix)
+        with state.lock:
+            if self.mode == "sharded":
+                progress = self._load_sharded(student_s3_prefix, state)
+            elif self.mode == "delta_log":
+                progress, tail_keys, log_position = self._read_with_log(student_s3_prefix)
+                state.log_seen = log_position
+                state.log_tail = len(tail_keys)
+                state.etag = None
+            else:
+                progress, state.etag = self._read_object(self._progress_key(student_s3_prefix))
+            stored_progress, progress = progress, upgrade_progress(progress)
+            state.progress = progress or {}
+            state.loaded = True
+            state.version += 1
+            self._upgrade_stored(student_s3_prefix, state, legacy_snapshot=progress is not stored_progress)
+            needs_compaction = self.mode == "delta_log" and state.log_tail >= LOG_COMPACT_AFTER
+        if needs_compaction:
+            self.start_compaction(student_s3_prefix)
+        return copy.deepcopy(progress) if progress else None
+
+    def load_day(self, student_s3_prefix, day):
+        """Return one day's progress, reading it from S3 only if this process hasn't yet
+
+        Only sharded mode leaves days unread; the other modes answer from what load() read.
+        Returns None when the day has no progress.
+        """
+        state = self._state(student_s3_prefix)
+        with state.lock:
+            if self.mode == "sharded" and day not in state.days:
+                state.days[day] = self._read_object(self._day_key(student_s3_prefix, day))
+                self.stats.incr("day_reads")
+                self._upgrade_stored(student_s3_prefix, state, day)
+                if state.loaded:
+                    state.progress = self._sharded_view(state)
+                    state.version += 1
+            if not state.loaded:
+                day_data = upgrade_day(day, state.days.get(day, (None, None))[0])
+            else:
+                day_data = state.progress.get(day)
+            return copy.deepcopy(day_data) if day_data else None
+
+    def _upgrade_stored(self, student_s3_prefix, state, day=None, legacy_snapshot=False):
+        """Rewrite a schema 1 object just read in the current schema; best effort
+
+        Single file strategies rewrite progress.json, sharded mode the given day (default: the current
+        day). The delta log is left to its next compaction.
+        """
+        try:
+            if self.mode in SINGLE_FILE_STRATEGIES and legacy_snapshot and state.etag:
+                self._save_snapshot(student_s3_prefix, state, {"_schema": PROGRESS_SCHEMA})
+            elif self.mode == "sharded":
+                day = day or state.progress.get("_current_day")
+                stored = state.days.get(day)
+                if stored and is_legacy_day(stored[0]):
+                    state.days[day] = self._put_merged(
+                        self._day_key(student_s3_prefix, day), stored, lambda data: upgrade_day(day, data)
+                    )
+                else:
+                    return
+            else:
+                return
+            self.stats.incr("schema_upgrades")
+        except Exception:
+            # Still readable as it is - the next save writes the current schema anyway
+            self.stats.incr("failed_schema_upgrades")
+
+    def known_progress(self, student_s3_prefix, since_version=None):
+        """Return (version, progress) as last read or written, without any S3 traffic
+
+        version goes up whenever the known progress changes, so callers can tell when
+        another session's writes have arrived. progress is None when nothing is known
+        or nothing changed since since_version.
+        """
+        state = self._state(student_s3_prefix)
+        with state.lock:
+            if not state.loaded or state.version == since_version:
+                return state.version, None
+            return state.version, copy.deepcopy(state.progress)
+
+    # Saving
+
+    def save(self, student_s3_prefix, progress_data):
+        """Merge progress changes into the stored progress; raises on failure"""
+        state = self._state(student_s3_prefix)
+        with state.lock:
+            needs_compaction = False
+            if self.mode == "sharded":
+                self._save_sharded(student_s3_prefix, state, progress_data)
+            elif self.mode == "delta_log":
+                needs_compaction = self._append_delta(student_s3_prefix, state, progress_data)
+            else:
+                self._save_snapshot(student_s3_prefix, state, progress_data)
+        if needs_compaction:
+            self.start_compaction(student_s3_prefix)
+
+    def _save_snapshot(self, student_s3_prefix, state, progress_data):
+        """Write progress.json with one of the single file strategies"""
+        progress_key = self._progress_key(student_s3_prefix)
+        try:
+            if not state.loaded or self.mode == "merge":
+                # Nothing known about the stored file yet (or "merge", which always reads first)
+                state.progress, state.etag = self._read_object(progress_key)
+                state.progress = state.progress or {}
+                state.loaded = True
+                self.stats.incr("refetches")
+
+            for attempt in range(SAVE_ATTEMPTS):
+                merged_progress = merge_progress(state.progress, progress_data)
+                body, put_args = encode_json(merged_progress, self.stats)
+
+                # Only overwrite the version we merged into, or create the file if there is none
+                if self.mode == "conditional_write":
+                    condition = {'IfMatch': state.etag} if state.etag else {'IfNoneMatch': '*'}
+                else:
+                    condition = {}
+                try:
+                    response = self.s3.put_object(
+                        Bucket=self.bucket,
+                        Key=progress_key,
+                        Body=body,
+                        **put_args,
+                        **condition
+                    )
+                except ClientError as e:
+                    if not is_precondition_failure(e):
+                        raise
+                    # Another tab or device saved first - merge into its version and try again
+                    self.stats.incr("conflicts")
+                    state.progress, state.etag = self._read_object(progress_key)
+                    state.progress = state.progress or {}
+                    state.version += 1
+                    self.stats.incr("refetches")
+                    continue
+
+                state.progress = merged_progress
+                state.etag = response.get('ETag')
+                state.version += 1
+                self.stats.incr("saves")
+                self.stats.incr("bytes_written", len(body))
+                return
+            raise ProgressConflictError("progress was changed somewhere else at the same time")
+        except Exception:
+            # Start from a fresh read next time
+            state.loaded = False
+            self.stats.incr("failed_saves")
+            raise
+
+    # Sharded index and days
+
+    def _put_merged(self, key, known, merge):
+        """Merge changes into one object with conditional PUTs, re-reading it when another writer wins
+
+        known is the (data, etag) last seen, or None to read the object first. merge takes the
+        stored data and returns the new data. Nothing is written when merge changes nothing.
+        Returns the new (data, etag).
+        """
+        if known is None:
+            known = self._read_object(key)
+            self.stats.incr("refetches")
+        data, etag = known
+        data = data or {}
+        for attempt in range(SAVE_ATTEMPTS):
+            merged = merge(data)
+            if merged == data:
+                return data, etag
+            body, put_args = encode_json(merged, self.stats)
+            condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+            try:
+                response = self.s3.put_object(
+                    Bucket=self.bucket,
+                    Key=key,
+                    Body=body,
+                    **put_args,
+                    **condition
+                )
+            except ClientError as e:
+                if not is_precondition_failure(e):
+                    raise
+                self.stats.incr("conflicts")
+                data, etag = self._read_object(key)
+                data = data or {}
+                self.stats.incr("refetches")
+                continue
+            self.stats.incr("objects_written")
+            self.stats.incr("bytes_written", len(body))
+            return merged, response.get('ETag')
+        raise ProgressConflictError("progress was changed somewhere else at the same time")
+
+    def _sharded_view(self, state):
+        """Put the index and the days read so far back together as one progress document"""
+        index = state.index[0] if state.index else {}
+        return merge_progress(index, {day: data for day, (data, _) in state.days.items() if data})
+
+    def _load_sharded(self, student_s3_prefix, state):
+        index, index_etag = self._read_object(self._index_key(student_s3_prefix))
+        if index is None:
+            return self._shard_legacy_progress(student_s3_prefix, state)
+        state.index = (index, index_etag)
+        state.days = {}
+        current_day = index.get("_current_day")
+        if current_day:
+            state.days[current_day] = self._read_object(self._day_key(student_s3_prefix, current_day))
+        state.progress = self._sharded_view(state)
+        return state.progress
+
+    def _shard_legacy_progress(self, student_s3_prefix, state):
+        """First sharded load of a student: split progress.json (and any delta log) into shards
+
+        progress.json is left in place. Days are written before the index, so an index always
+        points at days that exist; a half-finished split is merged over by the next login.
+        """
+        legacy_progress = upgrade_progress(self._read_with_log(student_s3_prefix)[0])
+        state.index = (None, None)
+        state.days = {}
+        if not legacy_progress:
+            state.progress = {}
+            return None
+        for day, data in legacy_progress.items():
+            if day.startswith("_") or not isinstance(data, dict):
+                continue
+            state.days[day] = self._put_merged(
+                self._day_key(student_s3_prefix, day), (None, None),
+                lambda stored, day=day, data=data: merge_progress({day: stored}, {day: data})[day]
+            )
+        state.index = self._put_merged(
+            self._index_key(student_s3_prefix), (None, None),
+            lambda stored: merge_progress(stored, progress_index(legacy_progress))
+        )
+        self.stats.incr("students_sharded")
+        state.progress = self._sharded_view(state)
+        return state.progress
+
+    def _save_sharded(self, student_s3_prefix, state, progress_data):
+        """Write the days that changed, then the index if their completion or the current day moved"""
+        try:
+            if not state.loaded:
+                self._load_sharded(student_s3_prefix, state)
+                state.loaded = True
+                self.stats.incr("refetches")
+
+            for day, data in progress_data.items():
+                if day.startswith("_") or not isinstance(data, dict):
+                    continue
+                state.days[day] = self._put_merged(
+                    self._day_key(student_s3_prefix, day), state.days.get(day),
+                    lambda stored: merge_progress({day: stored}, {day: data})[day]
+                )
+            state.index = self._put_merged(
+                self._index_key(student_s3_prefix), state.index,
+                lambda stored: merge_progress(stored, progress_index(progress_data))
+            )
+        except Exception:
+            state.loaded = False
+            self.stats.incr("failed_saves")
+            raise
+        state.progress = self._sharded_view(state)
+        state.version += 1
+        self.stats.incr("saves")
+
+    # Delta log
+
+    def _list_deltas(self, student_s3_prefix, start_after=None):
+        """Return the keys of the deltas in the student's progress log, oldest first"""
+        delta_keys = []
+        list_args = {'Bucket': self.bucket, 'Prefix': self._log_prefix(student_s3_prefix)}
+        if start_after:
+            list_args['StartAfter'] = start_after
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(**list_args):
+            for obj in page.get('Contents', []):
+                if obj['Key'].endswith('.json'):
+                    delta_keys.append(obj['Key'])
+        delta_keys.sort()
+        return delta_keys
+
+    def _apply_deltas(self, progress, delta_keys):
+        for delta_key in delta_keys:
+            response = self.s3.get_object(Bucket=self.bucket, Key=delta_key)
+            progress = merge_progress(progress, decode_json(response['Body'].read(), self.stats))
+        return progress
+
+    def _read_with_log(self, student_s3_prefix):
+        """Read progress.json plus the deltas appended after it
+
+        Returns (progress, tail_keys, log_position) where log_position is the last delta key
+        the result includes.
+        """
+        for attempt in range(SAVE_ATTEMPTS):
+            # List before reading the snapshot: a compaction in between only moves deltas into it
+            delta_keys = self._list_deltas(student_s3_prefix)
+            snapshot, _ = self._read_object(self._progress_key(student_s3_prefix))
+            progress = snapshot or {}
+            watermark = progress.pop("_log_watermark", "")
+            tail_keys = [key for key in delta_keys if key > watermark]
+            try:
+                progress = self._apply_deltas(progress, tail_keys)
+            except ClientError as e:
+                # A newer compaction removed deltas we listed - read again
+                if not is_missing(e):
+                    raise
+                continue
+            return progress, tail_keys, (tail_keys[-1] if tail_keys else watermark)
+        raise RuntimeError("Progress log kept changing while loading")
+
+    def _append_delta(self, student_s3_prefix, state, progress_data):
+        """Write the changes as one new object; returns True when the log is due for compaction"""
+        state.log_seq += 1
+        delta_key = (f"{self._log_prefix(student_s3_prefix)}"
+                     f"{int(time.time() * 1000):013d}-{self.writer_id}-{state.log_seq:06d}.json")
+        body, put_args = encode_json(progress_data, self.stats)
+        try:
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=delta_key,
+                Body=body,
+                IfNoneMatch='*',
+                **put_args
+            )
+        except Exception:
+            self.stats.incr("failed_saves")
+            raise
+        self.stats.incr("deltas")
+        self.stats.incr("bytes_written", len(body))
+
+        if state.loaded:
+            state.progress = merge_progress(state.progress, progress_data)
+            state.version += 1
+            # Picking up other writers' answers is best effort - the save itself already succeeded
+            try:
+                self._pull_deltas(student_s3_prefix, state)
+            except ClientError:
+                pass
+
+        state.log_tail += 1
+        if state.log_tail >= LOG_COMPACT_AFTER:
+            state.log_tail = 0
+            return True
+        return False
+
+    def _pull_deltas(self, student_s3_prefix, state):
+        """Apply deltas written by other processes since this one last looked"""
+        delta_keys = self._list_deltas(student_s3_prefix, start_after=state.log_seen)
+        if not delta_keys:
+            return
+        other_keys = [key for key in delta_keys if f"-{self.writer_id}-" not in key]
+        if other_keys:
+            try:
+                state.progress = self._apply_deltas(state.progress, other_keys)
+            except ClientError as e:
+                if not is_missing(e):
+                    raise
+                # Compacted while we looked - the next login picks it up from the snapshot
+                return
+            state.version += 1
+        state.log_seen = delta_keys[-1]
+
+    def compact(self, student_s3_prefix):
+        """Fold settled deltas into progress.json, then delete them. Returns the number folded."""
+        progress_key = self._progress_key(student_s3_prefix)
+        delta_keys = self._list_deltas(student_s3_prefix)
+        snapshot, etag = self._read_object(progress_key)
+        progress = snapshot or {}
+        watermark = progress.pop("_log_watermark", "")
+
+        settled_before = f"{self._log_prefix(student_s3_prefix)}{int((time.time() - LOG_SETTLE_SECONDS) * 1000):013d}"
+        fold_keys = [key for key in delta_keys if watermark < key < settled_before]
+        if not fold_keys:
+            return 0
+
+        progress = self._apply_deltas(progress, fold_keys)
+        progress["_log_watermark"] = fold_keys[-1]
+        body, put_args = encode_json(progress, self.stats)
+        condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+        try:
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=progress_key,
+                Body=body,
+                **put_args,
+                **condition
+            )
+        except ClientError as e:
+            if is_precondition_failure(e):
+                # Another compaction got there first
+                return 0
+            raise
+
+        # Everything up to the watermark is in the snapshot now
+        folded_keys = [key for key in delta_keys if key <= fold_keys[-1]]
+        for i in range(0, len(folded_keys), 1000):
+            self.s3.delete_objects(
+                Bucket=self.bucket,
+                Delete={'Objects': [{'Key': key} for key in folded_keys[i:i + 1000]], 'Quiet': True}
+            )
+        return len(fold_keys)
+
+    def start_compaction(self, student_s3_prefix):
+        """Compact the student's progress log on a background thread, one at a time per student"""
+        with self._lock:
+            if student_s3_prefix in self._compacting:
+                return
+            self._compacting.add(student_s3_prefix)
+
+        def run():
+            try:
+                self.stats.incr("deltas_compacted", self.compact(student_s3_prefix))
+                self.stats.incr("compactions")
+            except Exception:
+                self.stats.incr("failed_compactions")
+            finally:
+                with self._lock:
+                    self._compacting.discard(student_s3_prefix)
+
+        threading.Thread(target=run, name="progress-compaction", daemon=True).start()
+
+
+class ProgressJournal:
+    """Local write-ahead journal of progress saves, kept in SQLite on the app host
+
+    Every save is committed here before it is sent to S3 and deleted once S3 has it, so
+    saves survive S3 slowdowns and app restarts. Failed saves get a next attempt time that
+    backs off exponentially.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            if path != ":memory:":
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=FULL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS progress_journal ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " student_prefix TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " next_attempt_at REAL NOT NULL DEFAULT 0,"
+                " last_error TEXT)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS progress_journal_student ON progress_journal (student_prefix, id)"
+            )
+
+    def append(self, student_s3_prefix, progress_data):
+        """Durably record a save; returns its journal id"""
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO progress_journal (student_prefix, payload, created_at) VALUES (?, ?, ?)",
+                (student_s3_prefix, json.dumps(progress_data, separators=(',', ':')), time.time())
+            )
+            return cursor.lastrowid
+
+    def entries(self, student_s3_prefix):
+        """Return [(id, progress_data, attempts, next_attempt_at)] for the student, oldest first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, payload, attempts, next_attempt_at FROM progress_journal"
+                " WHERE student_prefix = ? ORDER BY id",
+                (student_s3_prefix,)
+            ).fetchall()
+        return [(row[0], json.loads(row[1]), row[2], row[3]) for row in rows]
+
+    def remove(self, entry_ids):
+        with self._lock:
+            self._db.executemany("DELETE FROM progress_journal WHERE id = ?", [(entry_id,) for entry_id in entry_ids])
+
+    def defer(self, entry_ids, error, next_attempt_at):
+        with self._lock:
+            self._db.executemany(
+                "UPDATE progress_journal SET attempts = attempts + 1, next_attempt_at = ?, last_error = ?"
+                " WHERE id = ?",
+                [(next_attempt_at, error, entry_id) for entry_id in entry_ids]
+            )
+
+    def due_students(self, now):
+        """Return the students with saves waiting whose next attempt is due"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT student_prefix FROM progress_journal"
+                " GROUP BY student_prefix HAVING MAX(next_attempt_at) <= ?",
+                (now,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def status(self, student_s3_prefix):
+        """Return (saves waiting, saves that failed at least once, latest error)"""
+        with self._lock:
+            waiting, failed = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(attempts > 0), 0) FROM progress_journal WHERE student_prefix = ?",
+                (student_s3_prefix,)
+            ).fetchone()
+            row = self._db.execute(
+                "SELECT last_error FROM progress_journal"
+                " WHERE student_prefix = ? AND last_error IS NOT NULL ORDER BY id DESC LIMIT 1",
+                (student_s3_prefix,)
+            ).fetchone()
+        return waiting, failed, row[0] if row else None
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM progress_journal").fetchone()[0]
+
+
+class ProgressWriter:
+    """Replicates journalled progress saves to S3 on background threads
+
+    submit() only writes to the local journal, so the page never waits for S3. Students are
+    spread over a few worker threads and all of one student's saves go to the same worker.
+    A worker sends everything the student has waiting as one merged save; when that fails,
+    the student's saves are retried with exponential backoff. A sweeper thread picks up
+    due retries, including saves left in the journal by a previous run of the app.
+    """
+
+    def __init__(self, store, journal, workers=4, sweep_seconds=5, max_backoff=60):
+        self.store = store
+        self.journal = journal
+        self.sweep_seconds = sweep_seconds
+        self.max_backoff = max_backoff
+        self._queues = [queue.Queue() for _ in range(workers)]
+        self._scheduled = set()
+        self._saved_at = {}
+        self._changed = threading.Condition()
+        for worker_queue in self._queues:
+            threading.Thread(target=self._run, args=(worker_queue,), name="progress-writer", daemon=True).start()
+        threading.Thread(target=self._sweep, name="progress-journal-sweeper", daemon=True).start()
+
+    def submit(self, student_s3_prefix, progress_data):
+        """Journal a save and wake the student's worker; raises if the journal can't be written"""
+        self.journal.append(student_s3_prefix, progress_data)
+        self._schedule(student_s3_prefix)
+
+    def _schedule(self, student_s3_prefix):
+        with self._changed:
+            if student_s3_prefix in self._scheduled:
+                return
+            self._scheduled.add(student_s3_prefix)
+        worker_queue = self._queues[zlib.crc32(student_s3_prefix.encode('utf-8')) % len(self._queues)]
+        worker_queue.put(student_s3_prefix)
+
+    def pending_progress(self, student_s3_prefix):
+        """Return the saves that haven't reached S3 yet, oldest first"""
+        return [progress_data for _, progress_data, _, _ in self.journal.entries(student_s3_prefix)]
+
+    def status(self, student_s3_prefix):
+        """Return {"pending", "failed", "error", "saved_at"} for the student"""
+        waiting, failed, error = self.journal.status(student_s3_prefix)
+        with self._changed:
+            saved_at = self._saved_at.get(student_s3_prefix)
+        return {"pending": waiting, "failed": failed, "error": error, "saved_at": saved_at}
+
+    def flush(self, timeout=None):
+        """Wait until the journal is empty; returns False on timeout"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._changed:
+            while self.journal.count():
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._changed.wait(0.2 if remaining is None else min(remaining, 0.2))
+        return True
+
+    def close(self, timeout=10):
+        """Give queued saves a chance to reach S3 on shutdown - the rest is replayed on the next start"""
+        self.flush(timeout)
+
+    def _run(self, worker_queue):
+        while True:
+            student_s3_prefix = worker_queue.get()
+            with self._changed:
+                # Saves submitted from here on schedule the student again
+                self._scheduled.discard(student_s3_prefix)
+            try:
+                self._replicate(student_s3_prefix)
+            except Exception:
+                # The journal itself failed - the sweeper will try again
+                self.store.stats.incr("journal_errors")
+            with self._changed:
+                self._changed.notify_all()
+
+    def _replicate(self, student_s3_prefix):
+        entries = self.journal.entries(student_s3_prefix)
+        if not entries:
+            return
+        now = time.time()
+        if any(next_attempt_at > now for _, _, _, next_attempt_at in entries):
+            # Still backing off after a failure
+            return
+
+        entry_ids = [entry_id for entry_id, _, _, _ in entries]
+        merged_data = {}
+        for _, progress_data, _, _ in entries:
+            merged_data = merge_progress(merged_data, progress_data)
+        try:
+            self.store.save(student_s3_prefix, merged_data)
+        except Exception as e:
+            attempts = max(attempts for _, _, attempts, _ in entries) + 1
+            delay = min(self.max_backoff, 0.5 * 2 ** attempts) * random.uniform(0.5, 1.0)
+            self.journal.defer(entry_ids, str(e), now + delay)
+            self.store.stats.incr("replication_retries")
+            return
+        self.journal.remove(entry_ids)
+        self.store.stats.incr("journal_entries_replicated", len(entry_ids))
+        with self._changed:
+            self._saved_at[student_s3_prefix] = time.time()
+
+    def _sweep(self):
+        while True:
+            try:
+                for student_s3_prefix in self.journal.due_students(time.time()):
+                    self._schedule(student_s3_prefix)
+            except Exception:
+                self.store.stats.incr("journal_errors")
+            time.sleep(self.sweep_seconds)
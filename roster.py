@@ -0,0 +1,149 @@
+"""Which students exist and which group each belongs to.
+
+The login page reads this from a manifest, Summer_Activities/roster.json:
+    {
+        "version": "<hash of the roster>",
+        "generated_at": "2024-06-10 10:00:00",
+        "students": {"<student folder>": "<group folder>"},
+        "credentials": {"<group folder>": "<version of the group's credentials.json>"}
+    }
+manage_roster.py regenerates it from the bucket. The credential versions tell the app when a
+group's passwords have changed (see credentials.py). Without a manifest the roster is worked
+out from the group and student folder names (see list_students).
+
+manage_roster.py builds the manifest with the same list_students the app falls back on, so
+both agree on who is in which group.
+"""
+import bisect
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from storage_codec import decode_json, encode_json
+
+BASE_PREFIX = "Summer_Activities/"
+ROSTER_KEY = f"{BASE_PREFIX}roster.json"
+# Groups listed at the same time when there is no manifest
+LIST_WORKERS = 8
+# Names sent to the login page for one search
+SEARCH_LIMIT = 20
+
+
+def is_student_folder(name):
+    """False for the password and config files that sit next to the student folders"""
+    return bool(name) and '.txt' not in name and '.json' not in name
+
+
+def students_from_keys(keys, base_prefix=BASE_PREFIX):
+    """Return {student: group} for the student folders the object keys are in
+
+    The rules list_students follows, applied to a full listing of the bucket.
+    """
+    student_to_group = {}
+    for key in keys:
+        relative_key = key[len(base_prefix):] if key.startswith(base_prefix) else key
+        parts = relative_key.split('/')
+        # Only files inside a student folder count, not files directly in a group folder
+        if len(parts) < 3:
+            continue
+        group, student = parts[0], parts[1]
+        if not group or not is_student_folder(student):
+            continue
+        student_to_group.setdefault(student, group)
+    return student_to_group
+
+
+def list_folders(s3, bucket, prefix):
+    """Return the names of the folders directly under prefix"""
+    names = []
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter='/'):
+        for common_prefix in page.get('CommonPrefixes', []):
+            names.append(common_prefix['Prefix'][len(prefix):].rstrip('/'))
+    return names
+
+
+def list_students(s3, bucket, base_prefix=BASE_PREFIX, workers=LIST_WORKERS):
+    """Work out {student: group} from folder names, without listing the files inside them
+
+    Lists the group folders, then each group's student folders in parallel, so the number of
+    LIST calls grows with groups and students rather than with files. A folder only shows
+    up when it holds at least one object, as with a full listing.
+    """
+    # Ordered as their keys are, so a student found in two groups gets the group a full listing gives
+    groups = sorted((group for group in list_folders(s3, bucket, base_prefix) if group), key=lambda group: group + '/')
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        group_students = list(executor.map(lambda group: list_folders(s3, bucket, f"{base_prefix}{group}/"), groups))
+
+    student_to_group = {}
+    for group, students in zip(groups, group_students):
+        for student in students:
+            if is_student_folder(student):
+                student_to_group.setdefault(student, group)
+    return student_to_group
+
+
+def roster_version(students):
+    """Content hash of a roster - changes whenever a student is added, removed or moved"""
+    canonical = json.dumps(students, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(canonical).hexdigest()[:16]
+
+
+def make_roster(students, credentials=None):
+    return {
+        "version": roster_version(students),
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "students": dict(sorted(students.items())),
+        "credentials": dict(sorted((credentials or {}).items())),
+    }
+
+
+class RosterIndex:
+    """The roster with a prefix index over the student names, for searching as a student types"""
+
+    def __init__(self, students, version=None, credentials=None):
+        self.students = dict(students)
+        self.version = version
+        self.credentials = dict(credentials or {})
+        entries = sorted((student.lower(), student) for student in self.students)
+        self._keys = [key for key, _ in entries]
+        self._names = [student for _, student in entries]
+
+    @classmethod
+    def from_roster(cls, roster):
+        return cls(roster.get("students", {}), roster.get("version"), roster.get("credentials"))
+
+    def __len__(self):
+        return len(self._names)
+
+    def group_of(self, student):
+        return self.students.get(student)
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Return (up to limit students whose names start with query, ignoring case, whether there are more)"""
+        prefix = query.strip().lower()
+        if not prefix:
+            return [], False
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + '\uffff', lo=start)
+        return self._names[start:min(end, start + limit)], end - start > limit
+
+
+def read_roster(s3, bucket, key=ROSTER_KEY):
+    """Return the roster manifest, or None when there is none"""
+    try:
+        response = s3.get_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return None
+        raise
+    return decode_json(response['Body'].read())
+
+
+def write_roster(s3, bucket, roster, key=ROSTER_KEY):
+    body, put_args = encode_json(roster)
+    s3.put_object(Bucket=bucket, Key=key, Body=body, **put_args)
+    return len(body)
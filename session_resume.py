@@ -0,0 +1,116 @@
+"""Resuming a logged-in student after a page refresh or websocket reconnect.
+
+Streamlit starts a new session for each connection, so the login and everything loaded
+after it would otherwise be lost. At login the app puts a signed resume token in the page
+URL. It also keeps the student's session state in a HydratedStateCache, so a new session
+showing a valid token can pick up where the last one stopped without reading S3.
+"""
+import base64
+import copy
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# A token older than this needs a fresh login
+RESUME_TOKEN_MAX_AGE_SECONDS = 12 * 60 * 60
+# Session state of students who have been idle longer than this is dropped
+HYDRATED_STATE_TTL_SECONDS = 30 * 60
+HYDRATED_STATE_MAX_STUDENTS = 500
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _signature(secret, payload):
+    return _b64encode(hmac.new(secret.encode('utf-8'), payload.encode('ascii'), hashlib.sha256).digest())
+
+
+def make_resume_token(secret, student_key, now=None):
+    """Return a URL-safe token naming the student, signed with secret"""
+    issued_at = round(now if now is not None else time.time(), 3)
+    payload = _b64encode(json.dumps({"student": student_key, "issued_at": issued_at}).encode('utf-8'))
+    return f"{payload}.{_signature(secret, payload)}"
+
+
+def read_resume_token(secret, token, max_age_seconds=RESUME_TOKEN_MAX_AGE_SECONDS, now=None):
+    """Return (student key, issued at) from a token, or None when it is forged, malformed or expired"""
+    try:
+        payload, signature = token.split('.')
+        if not hmac.compare_digest(signature, _signature(secret, payload)):
+            return None
+        claims = json.loads(_b64decode(payload))
+        student_key, issued_at = claims["student"], float(claims["issued_at"])
+    except (AttributeError, ValueError, KeyError, TypeError):
+        return None
+    now = now if now is not None else time.time()
+    if not issued_at <= now + 60 or now - issued_at > max_age_seconds:
+        return None
+    return student_key, issued_at
+
+
+class HydratedStateCache:
+    """Session state of logged-in students, per process, for restoring it in a new session
+
+    Entries are copied going in and coming out, so tabs of the same student never share
+    mutable state; values under shared_keys (activity packs, which are only read) are kept
+    by reference. A student's entry expires ttl_seconds after it was last stored.
+    """
+
+    def __init__(self, ttl_seconds=HYDRATED_STATE_TTL_SECONDS, max_students=HYDRATED_STATE_MAX_STUDENTS,
+                 shared_keys=()):
+        self.ttl_seconds = ttl_seconds
+        self.max_students = max_students
+        self.shared_keys = frozenset(shared_keys)
+        self._entries = OrderedDict()
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _copy(self, state):
+        return {key: value if key in self.shared_keys else copy.deepcopy(value) for key, value in state.items()}
+
+    def put(self, student_key, state):
+        state = self._copy(state)
+        with self._lock:
+            self._entries.pop(student_key, None)
+            self._entries[student_key] = (state, time.time())
+            while len(self._entries) > self.max_students:
+                self._entries.popitem(last=False)
+
+    def get(self, student_key):
+        """Return a copy of the student's last stored state, or None"""
+        with self._lock:
+            entry = self._entries.get(student_key)
+            if entry is not None and time.time() - entry[1] > self.ttl_seconds:
+                del self._entries[student_key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            state = entry[0]
+        return self._copy(state)
+
+    def revoke(self, student_key):
+        """Forget the student's state and refuse tokens issued until now - used on logout"""
+        with self._lock:
+            self._entries.pop(student_key, None)
+            self._revoked[student_key] = time.time()
+
+    def is_revoked(self, student_key, issued_at):
+        with self._lock:
+            revoked_at = self._revoked.get(student_key)
+        return revoked_at is not None and issued_at <= revoked_at
+
+    def stats(self):
+        with self._lock:
+            return {"students": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,427 @@
+"""Contract checks and benchmarks for the app's S3 storage, against an in-memory S3.
+
+progress: runs every strategy in progress_store.PROGRESS_STRATEGIES, reports which
+guarantees it keeps and what it costs in S3 requests and bytes per answer.
+roster: builds a synthetic bucket and compares working out the roster from a full listing
+with the folder-by-folder discovery in roster.list_students.
+No AWS access is needed.
+
+Usage:
+    python storage_bench.py progress [--strategies sharded delta_log] [--days 10] [--questions 20] [--flush-every 5]
+    python storage_bench.py roster [--groups 10] [--students 40] [--days 30] [--files 20]
+
+Exits with status 1 when a strategy breaks a guarantee it is meant to keep, or when the
+two roster methods disagree.
+"""
+import argparse
+import bisect
+import hashlib
+import sys
+import threading
+import time
+from collections import Counter
+
+from botocore.exceptions import ClientError
+
+from progress_store import PROGRESS_SCHEMA, PROGRESS_STRATEGIES, ProgressStore
+from roster import BASE_PREFIX, list_students, students_from_keys
+
+BUCKET_NAME = "bench-bucket"
+STUDENT_PREFIX = "Summer_Activities/Group1/student"
+
+
+class _Body:
+    def __init__(self, content):
+        self._content = content
+
+    def read(self):
+        return self._content
+
+
+class _Paginator:
+    def __init__(self, s3):
+        self.s3 = s3
+
+    def paginate(self, **kwargs):
+        while True:
+            page = self.s3.list_objects_v2(**kwargs)
+            yield page
+            if not page.get('IsTruncated'):
+                return
+            kwargs['ContinuationToken'] = page['NextContinuationToken']
+
+
+class FakeS3:
+    """Just enough of the boto3 S3 client for the progress store, counting requests and bytes
+
+    before_put, when set, is called with the key before each PUT is applied - used to
+    make another writer land between a read and a write.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.requests = Counter()
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.before_put = None
+        self._sorted_keys = None
+        self._lock = threading.Lock()
+
+    def add_objects(self, keys, content=b''):
+        """Fill the bucket without counting requests"""
+        for key in keys:
+            self.objects[key] = (content, '"synthetic"')
+        self._sorted_keys = None
+
+    def _count(self, request):
+        with self._lock:
+            self.requests[request] += 1
+
+    def _keys(self):
+        keys = self._sorted_keys
+        if keys is None:
+            keys = self._sorted_keys = sorted(self.objects)
+        return keys
+
+    def _error(self, code, status, operation):
+        return ClientError({'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': status}}, operation)
+
+    def get_object(self, Bucket, Key, **kwargs):
+        self._count('GET')
+        if Key not in self.objects:
+            raise self._error('NoSuchKey', 404, 'GetObject')
+        body, etag = self.objects[Key]
+        self.bytes_read += len(body)
+        return {'Body': _Body(body), 'ETag': etag, 'ContentLength': len(body)}
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, **kwargs):
+        if self.before_put:
+            self.before_put(Key)
+        self._count('PUT')
+        if IfNoneMatch == '*' and Key in self.objects:
+            raise self._error('PreconditionFailed', 412, 'PutObject')
+        if IfMatch is not None and (Key not in self.objects or self.objects[Key][1] != IfMatch):
+            raise self._error('PreconditionFailed', 412, 'PutObject')
+        if isinstance(Body, str):
+            Body = Body.encode('utf-8')
+        etag = f'"{hashlib.md5(Body).hexdigest()}"'
+        self.objects[Key] = (Body, etag)
+        self._sorted_keys = None
+        self.bytes_written += len(Body)
+        return {'ETag': etag}
+
+    def delete_objects(self, Bucket, Delete):
+        self._count('DELETE')
+        for obj in Delete['Objects']:
+            self.objects.pop(obj['Key'], None)
+        self._sorted_keys = None
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix='', Delimiter=None, StartAfter=None, ContinuationToken=None, MaxKeys=1000):
+        self._count('LIST')
+        keys = self._keys()
+        if ContinuationToken:
+            position = int(ContinuationToken)
+        else:
+            position = bisect.bisect_left(keys, Prefix)
+            if StartAfter:
+                position = max(position, bisect.bisect_right(keys, StartAfter))
+        contents, common_prefixes = [], []
+        while position < len(keys) and len(contents) + len(common_prefixes) < MaxKeys:
+            key = keys[position]
+            if not key.startswith(Prefix):
+                position = len(keys)
+                break
+            rest = key[len(Prefix):]
+            if Delimiter and Delimiter in rest:
+                # Like S3, a common prefix counts as one key and stands for everything under it
+                common_prefix = Prefix + rest.split(Delimiter, 1)[0] + Delimiter
+                common_prefixes.append({'Prefix': common_prefix})
+                position = bisect.bisect_left(keys, common_prefix + '\uffff')
+                continue
+            contents.append({'Key': key, 'Size': len(self.objects[key][0])})
+            position += 1
+        truncated = position < len(keys) and keys[position].startswith(Prefix)
+        page = {'KeyCount': len(contents) + len(common_prefixes), 'IsTruncated': truncated}
+        if contents:
+            page['Contents'] = contents
+        if common_prefixes:
+            page['CommonPrefixes'] = common_prefixes
+        if truncated:
+            page['NextContinuationToken'] = str(position)
+        return page
+
+    def get_paginator(self, name):
+        return _Paginator(self)
+
+
+def make_store(s3, strategy):
+    store = ProgressStore(s3, BUCKET_NAME, mode=strategy)
+    # Compaction runs on a background thread in the app; keep the counts deterministic here
+    store.start_compaction = lambda student_s3_prefix: None
+    return store
+
+
+def progress_delta(day, answers, stamp, completed=False, current_day=None, current_day_stamp=None):
+    """A save as the app sends it: the changed answers of one day, {question index: answer}"""
+    size = max(answers) + 1 if answers else 0
+    day_answers = [None] * size
+    day_meta = [None] * size
+    for index, value in answers.items():
+        day_answers[index] = value
+        day_meta[index] = list(stamp)
+    delta = {
+        "_schema": PROGRESS_SCHEMA,
+        "_current_day": current_day or day,
+        day: {
+            "answers": day_answers,
+            "answer_meta": day_meta,
+            "completed": completed,
+            "last_updated": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(stamp[0]))
+        }
+    }
+    if current_day_stamp:
+        delta["_current_day_stamp"] = list(current_day_stamp)
+    return delta
+
+
+def stored_progress(s3, strategy):
+    """What a fresh login sees, including days sharded mode would read lazily"""
+    store = make_store(s3, strategy)
+    progress = store.load(STUDENT_PREFIX) or {}
+    for day in [key for key in progress if not key.startswith("_")]:
+        progress[day] = store.load_day(STUDENT_PREFIX, day)
+    return progress
+
+
+# Contract checks - each returns True when the guarantee holds
+
+def check_round_trip(strategy):
+    """A save is what the next login reads"""
+    s3 = FakeS3()
+    make_store(s3, strategy).save(STUDENT_PREFIX, progress_delta("day1", {0: "a", 2: "c"}, (1.0, "s1"), completed=True))
+    progress = stored_progress(s3, strategy)
+    return (progress.get("_current_day") == "day1"
+            and progress["day1"]["answers"] == ["a", None, "c"]
+            and progress["day1"]["completed"])
+
+
+def check_deltas_accumulate(strategy):
+    """Saves carry only changed answers; earlier answers of the session are kept"""
+    s3 = FakeS3()
+    store = make_store(s3, strategy)
+    store.save(STUDENT_PREFIX, progress_delta("day1", {0: "a"}, (1.0, "s1")))
+    store.save(STUDENT_PREFIX, progress_delta("day1", {1: "b"}, (2.0, "s1")))
+    store.save(STUDENT_PREFIX, progress_delta("day2", {0: "x"}, (3.0, "s1")))
+    progress = stored_progress(s3, strategy)
+    return progress["day1"]["answers"] == ["a", "b"] and progress["day2"]["answers"] == ["x"]
+
+
+def check_completion_sticks(strategy):
+    """A completed day stays completed when a later save says otherwise"""
+    s3 = FakeS3()
+    store = make_store(s3, strategy)
+    store.save(STUDENT_PREFIX, progress_delta("day1", {0: "a"}, (1.0, "s1"), completed=True))
+    store.save(STUDENT_PREFIX, progress_delta("day1", {1: "b"}, (2.0, "s1"), completed=False))
+    return stored_progress(s3, strategy)["day1"]["completed"]
+
+
+def check_latest_answer_wins(strategy):
+    """Of two writes of the same answer, the later one is kept whatever order they arrive in"""
+    s3 = FakeS3()
+    store = make_store(s3, strategy)
+    store.save(STUDENT_PREFIX, progress_delta("day1", {0: "new"}, (2.0, "s2"), current_day_stamp=(2.0, "s2")))
+    store.save(STUDENT_PREFIX, progress_delta("day1", {0: "old"}, (1.0, "s1"), current_day="day0", current_day_stamp=(1.0, "s1")))
+    progress = stored_progress(s3, strategy)
+    return progress["day1"]["answers"] == ["new"] and progress["_current_day"] == "day1"
+
+
+def check_other_writers_kept(strategy):
+    """Another process's earlier save survives this process's next save"""
+    s3 = FakeS3()
+    first, second = make_store(s3, strategy), make_store(s3, strategy)
+    first.load(STUDENT_PREFIX)
+    second.load(STUDENT_PREFIX)
+    first.save(STUDENT_PREFIX, progress_delta("day1", {0: "from first"}, (1.0, "s1")))
+    second.save(STUDENT_PREFIX, progress_delta("day1", {1: "from second"}, (2.0, "s2")))
+    return stored_progress(s3, strategy)["day1"]["answers"] == ["from first", "from second"]
+
+
+def check_racing_writers_kept(strategy):
+    """A save that lands between another save's read and write survives it"""
+    s3 = FakeS3()
+    first, second = make_store(s3, strategy), make_store(s3, strategy)
+    first.save(STUDENT_PREFIX, progress_delta("day1", {0: "a"}, (1.0, "s1")))
+    second.load(STUDENT_PREFIX)
+
+    def race(key):
+        s3.before_put = None
+        first.save(STUDENT_PREFIX, progress_delta("day1", {1: "racing"}, (2.0, "s1")))
+
+    s3.before_put = race
+    second.save(STUDENT_PREFIX, progress_delta("day1", {2: "c"}, (3.0, "s2")))
+    return stored_progress(s3, strategy)["day1"]["answers"] == ["a", "racing", "c"]
+
+
+CONTRACT = [
+    check_round_trip,
+    check_deltas_accumulate,
+    check_completion_sticks,
+    check_latest_answer_wins,
+    check_other_writers_kept,
+    check_racing_writers_kept,
+]
+
+# Checks a strategy is known not to pass - everything else is required
+NOT_GUARANTEED = {
+    "overwrite": {check_other_writers_kept, check_racing_writers_kept},
+    "merge": {check_racing_writers_kept},
+}
+
+
+def run_contract(strategies):
+    """Print the contract results; returns the number of required checks that failed"""
+    failures = 0
+    print(f"{'strategy':<18} {'check':<28} result")
+    for strategy in strategies:
+        for check in CONTRACT:
+            try:
+                passed = check(strategy)
+            except Exception as e:
+                passed = False
+                print(f"{strategy:<18} {check.__name__[len('check_'):]:<28} error: {e}")
+            required = check not in NOT_GUARANTEED.get(strategy, set())
+            if passed:
+                result = "ok"
+            elif required:
+                result = "FAILED"
+                failures += 1
+            else:
+                result = "not guaranteed"
+            print(f"{strategy:<18} {check.__name__[len('check_'):]:<28} {result}")
+    return failures
+
+
+def run_benchmark(strategy, days, questions, flush_every):
+    """Simulate one student working through the days; returns the S3 cost per answer"""
+    s3 = FakeS3()
+    store = make_store(s3, strategy)
+    session_id = "bench"
+    clock = 1_700_000_000.0
+    for day_number in range(1, days + 1):
+        day = f"day{day_number}"
+        # Each day starts with a login
+        store.load(STUDENT_PREFIX)
+        answers = {}
+        for question in range(questions):
+            clock += 30
+            answers[question] = f"answer {question} of {day}"
+            if len(answers) >= flush_every:
+                store.save(STUDENT_PREFIX, progress_delta(day, answers, (clock, session_id)))
+                answers = {}
+        clock += 1
+        store.save(STUDENT_PREFIX, progress_delta(
+            day, answers, (clock, session_id), completed=True,
+            current_day=f"day{day_number + 1}", current_day_stamp=(clock, session_id)
+        ))
+    total_answers = days * questions
+
+    # What the next login costs once the summer is over
+    requests_before, read_before = sum(s3.requests.values()), s3.bytes_read
+    make_store(s3, strategy).load(STUDENT_PREFIX)
+    return {
+        "requests": sum(s3.requests.values()) / total_answers,
+        "bytes_written": s3.bytes_written / total_answers,
+        "bytes_read": s3.bytes_read / total_answers,
+        "login_requests": sum(s3.requests.values()) - requests_before,
+        "login_bytes": s3.bytes_read - read_before,
+        "objects": len(s3.objects),
+    }
+
+
+def run_progress(args):
+    failures = run_contract(args.strategies)
+
+    print()
+    print(f"{args.days} days x {args.questions} questions, a save every {args.flush_every} answers "
+          f"(delta log compaction not included)")
+    print(f"{'strategy':<18} {'requests/answer':>16} {'written/answer':>15} {'read/answer':>12} "
+          f"{'login requests':>15} {'login bytes':>12} {'objects':>8}")
+    for strategy in args.strategies:
+        cost = run_benchmark(strategy, args.days, args.questions, args.flush_every)
+        print(f"{strategy:<18} {cost['requests']:>16.2f} {cost['bytes_written']:>14.0f}B {cost['bytes_read']:>11.0f}B "
+              f"{cost['login_requests']:>15} {cost['login_bytes']:>11}B {cost['objects']:>8}")
+    return failures
+
+
+def synthetic_bucket(groups, students, days, files):
+    """A bucket laid out like the real one: password files, and per student days of audio plus progress"""
+    s3 = FakeS3()
+    keys = []
+    for group_number in range(1, groups + 1):
+        group = f"Group{group_number}"
+        group_prefix = f"{BASE_PREFIX}{group}/"
+        keys += [f"{group_prefix}{group}_passwords.txt", f"{group_prefix}passwords.json"]
+        for student_number in range(1, students + 1):
+            student = f"student{group_number:02d}{student_number:03d}"
+            keys.append(f"{group_prefix}{student}_passwords.txt")
+            keys.append(f"{group_prefix}{student}/progress.json")
+            for day in range(1, days + 1):
+                keys.append(f"{group_prefix}{student}/day{day}/activity_pack.json")
+                keys += [f"{group_prefix}{student}/day{day}/audio/clip{clip:03d}.mp3" for clip in range(files)]
+    s3.add_objects(keys)
+    return s3
+
+
+def list_students_from_all_objects(s3):
+    """How the roster used to be worked out: list every object, then filter the keys"""
+    keys = []
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=BUCKET_NAME, Prefix=BASE_PREFIX):
+        keys.extend(obj['Key'] for obj in page.get('Contents', []))
+    return students_from_keys(keys)
+
+
+def run_roster(args):
+    s3 = synthetic_bucket(args.groups, args.students, args.days, args.files)
+    print(f"{len(s3.objects)} objects, {args.groups} groups x {args.students} students")
+    print(f"{'method':<22} {'LIST calls':>10} {'seconds':>8} {'students':>9}")
+    results = []
+    for name, method in (("full listing", list_students_from_all_objects),
+                         ("folder discovery", lambda s3: list_students(s3, BUCKET_NAME))):
+        s3.requests.clear()
+        started = time.perf_counter()
+        students = method(s3)
+        elapsed = time.perf_counter() - started
+        results.append(students)
+        print(f"{name:<22} {s3.requests['LIST']:>10} {elapsed:>8.3f} {len(students):>9}")
+    if results[0] != results[1]:
+        print("FAILED: the two methods found different rosters")
+        return 1
+    print("ok: both methods found the same roster")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    progress_parser = subparsers.add_parser("progress", help="progress storage strategies")
+    progress_parser.add_argument("--strategies", nargs="+", choices=PROGRESS_STRATEGIES, default=list(PROGRESS_STRATEGIES))
+    progress_parser.add_argument("--days", type=int, default=10, help="days the simulated student completes")
+    progress_parser.add_argument("--questions", type=int, default=20, help="questions per day")
+    progress_parser.add_argument("--flush-every", type=int, default=5, help="answers per save")
+    progress_parser.set_defaults(run=run_progress)
+
+    roster_parser = subparsers.add_parser("roster", help="roster discovery without a manifest")
+    roster_parser.add_argument("--groups", type=int, default=10)
+    roster_parser.add_argument("--students", type=int, default=40, help="students per group")
+    roster_parser.add_argument("--days", type=int, default=30, help="day folders per student")
+    roster_parser.add_argument("--files", type=int, default=20, help="audio files per day")
+    roster_parser.set_defaults(run=run_roster)
+
+    args = parser.parse_args()
+    sys.exit(1 if args.run(args) else 0)
+
+
+if __name__ == "__main__":
+    main()
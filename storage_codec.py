@@ -0,0 +1,53 @@
+"""JSON encoding for objects the app stores in S3.
+
+New objects are written as minified, gzip-compressed JSON with Content-Encoding: gzip.
+Reading accepts both that and the plain JSON files written before, so buckets can be
+converted gradually. orjson is used for parsing when it is installed.
+"""
+import gzip
+import json
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+GZIP_MAGIC = b'\x1f\x8b'
+# Fast enough for every save, and most of the gain of higher levels on small JSON
+GZIP_LEVEL = 6
+
+
+def is_compressed(content):
+    return content[:2] == GZIP_MAGIC
+
+
+def encode_json(data, stats=None):
+    """Return (body, put_object arguments) for storing data as compressed JSON"""
+    if orjson is not None:
+        raw = orjson.dumps(data)
+    else:
+        raw = json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    body = gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+    if stats is not None:
+        stats.incr("json_bytes_encoded", len(raw))
+        stats.incr("stored_bytes_encoded", len(body))
+    return body, {'ContentType': 'application/json', 'ContentEncoding': 'gzip'}
+
+
+def decode_json(content, stats=None):
+    """Parse a stored JSON object, compressed or not. Empty content is an empty dict."""
+    if not content:
+        return {}
+    started = time.perf_counter()
+    stored_bytes = len(content)
+    # boto3 hands back the stored bytes as they are, whatever the Content-Encoding says
+    if is_compressed(content):
+        content = gzip.decompress(content)
+    data = orjson.loads(content) if orjson is not None else json.loads(content.decode('utf-8'))
+    if stats is not None:
+        stats.incr("objects_decoded")
+        stats.incr("stored_bytes_decoded", stored_bytes)
+        stats.incr("json_bytes_decoded", len(content))
+        stats.incr("decode_seconds", time.perf_counter() - started)
+    return data
@@ -1,6 +1,9 @@
 import streamlit as st
-import json
+import streamlit.components.v1 as components
 import base64
+import hashlib
+import html
+import os
 import boto3
 from botocore.exceptions import ClientError
 from io import BytesIO
@@ -8,8 +11,23 @@ import time
 import random
 from difflib import SequenceMatcher
 import math
+import atexit
+import secrets
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import plotly.graph_objects as go
 import plotly.express as px
+from audio_delivery import AUDIO_DELIVERY_MODES, AudioServer, PresignedUrlCache
+from credentials import CredentialStore, find_password
+from progress_store import (
+    PROGRESS_SCHEMA, ProgressJournal, ProgressStats, ProgressStore, ProgressWriter, get_slot, merge_progress, set_slot
+)
+from roster import ROSTER_KEY, RosterIndex, list_students
+from session_resume import HydratedStateCache, make_resume_token, read_resume_token
+from storage_codec import decode_json
 
 # Page config must be first
 st.set_page_config(layout="wide", page_title="Student Activities", page_icon="📚")
@@ -24,6 +42,7 @@ if "completed_days" not in st.session_state:
 if "question_page" not in st.session_state:
     st.session_state.question_page = 0
 if "answers" not in st.session_state:
+    # {day: [answer per question index, None while unanswered]}
     st.session_state.answers = {}
 if "opening_audio_played" not in st.session_state:
     st.session_state.opening_audio_played = set()
@@ -47,6 +66,30 @@ if "student_progress" not in st.session_state:
     st.session_state.student_progress = {}
 if "session_id" not in st.session_state:
     st.session_state.session_id = str(time.time())
+if "pending_progress" not in st.session_state:
+    st.session_state.pending_progress = {}
+if "pending_since" not in st.session_state:
+    st.session_state.pending_since = None
+if "progress_seen_version" not in st.session_state:
+    st.session_state.progress_seen_version = None
+if "persisted_answers" not in st.session_state:
+    st.session_state.persisted_answers = {}
+if "progress_days_loaded" not in st.session_state:
+    st.session_state.progress_days_loaded = set()
+if "prefetched_days" not in st.session_state:
+    st.session_state.prefetched_days = set()
+if "prefetched_audio" not in st.session_state:
+    st.session_state.prefetched_audio = set()
+if "audio_play_queue" not in st.session_state:
+    # [s3 key] for the audio player to play at the end of this run
+    st.session_state.audio_play_queue = []
+if "audio_clips_sent" not in st.session_state:
+    # {clip id: s3 key} of the clips the page's audio player already holds
+    st.session_state.audio_clips_sent = {}
+if "audio_play_nonce" not in st.session_state:
+    st.session_state.audio_play_nonce = 0
+if "audio_missing_nonce" not in st.session_state:
+    st.session_state.audio_missing_nonce = None
 
 # S3 Configuration
 BUCKET_NAME = "summer-activities-streamli-app"
@@ -73,6 +116,117 @@ s3 = get_s3_client()
 if not s3:
     st.stop()
 
+# Shared S3 object cache settings
+S3_CACHE_MAX_BYTES = 256 * 1024 * 1024
+S3_CACHE_MAX_OBJECT_BYTES = 10 * 1024 * 1024
+# Passwords and packs can be edited in the bucket, so entries go stale after a while
+S3_CACHE_TTL_SECONDS = 15 * 60
+
+class S3ObjectCache:
+    """Thread-safe LRU cache of S3 object bytes, bounded by total size"""
+
+    def __init__(self, max_bytes, max_object_bytes, ttl_seconds):
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._size = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        content, stored_at = entry
+        if self.ttl_seconds and time.time() - stored_at > self.ttl_seconds:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return content
+
+    def _remove(self, key):
+        content, _ = self._entries.pop(key)
+        self._size -= len(content)
+
+    def get(self, key):
+        with self._lock:
+            content = self._lookup(key)
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return content
+
+    def put(self, key, content):
+        if content is None or len(content) >= self.max_object_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (content, time.time())
+            self._size += len(content)
+            while self._size > self.max_bytes and self._entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def get_or_load(self, key, loader):
+        """Return cached bytes for key, calling loader() once on a miss even if many threads ask"""
+        with self._lock:
+            content = self._lookup(key)
+            if content is not None:
+                self.hits += 1
+                return content
+            self.misses += 1
+            event = self._inflight.get(key)
+            is_loader = event is None
+            if is_loader:
+                event = threading.Event()
+                self._inflight[key] = event
+        
+        if not is_loader:
+            # Another session is already downloading this object - wait for it
+            event.wait(timeout=30)
+            with self._lock:
+                content = self._lookup(key)
+            if content is not None:
+                return content
+            return loader()
+        
+        try:
+            content = loader()
+            self.put(key, content)
+            return content
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "objects": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+@st.cache_resource
+def get_s3_object_cache():
+    """One cache per server process, shared by every session"""
+    return S3ObjectCache(S3_CACHE_MAX_BYTES, S3_CACHE_MAX_OBJECT_BYTES, S3_CACHE_TTL_SECONDS)
+
 # Add custom CSS
 def add_custom_css():
     st.markdown("""
@@ -143,53 +297,131 @@ def add_custom_css():
     </style>
     """, unsafe_allow_html=True)
 
+# How progress is written - one of progress_store.PROGRESS_STRATEGIES: "sharded" (an index plus one
+# object per day), "conditional_write", "merge" or "overwrite" (all of it in progress.json), or
+# "delta_log" (small change objects). storage_bench.py compares them.
+PROGRESS_STORAGE_MODE = st.secrets.get("PROGRESS_STORAGE_MODE", "sharded")
+
+@st.cache_resource
+def get_progress_store():
+    """One progress store per server process, so all sessions share what it knows"""
+    return ProgressStore(s3, BUCKET_NAME, mode=PROGRESS_STORAGE_MODE)
+
+# Saves are journalled here on the app host before they are sent to S3
+PROGRESS_JOURNAL_PATH = st.secrets.get("PROGRESS_JOURNAL_PATH", "progress_journal.sqlite3")
+
+@st.cache_resource
+def get_progress_writer():
+    """Background writer for progress saves; replays what an earlier run left in the journal
+
+    Returns None when the journal can't be opened - saves then go straight to S3.
+    """
+    try:
+        journal = ProgressJournal(PROGRESS_JOURNAL_PATH)
+    except (sqlite3.Error, OSError):
+        return None
+    writer = ProgressWriter(get_progress_store(), journal)
+    atexit.register(writer.close)
+    return writer
+
+# Started with the app, not at the first login, so saves left in the journal are replayed straight away
+get_progress_writer()
+
+def get_progress_stats():
+    return get_progress_store().stats
+
+# "presigned" sends browsers straight to S3 for audio, "stream" to this process's audio server;
+# "inline" embeds it in the page (see audio_delivery.py)
+AUDIO_DELIVERY = st.secrets.get("AUDIO_DELIVERY", "presigned")
+# Where the audio server listens, and the address browsers reach it at
+AUDIO_STREAM_PORT = int(st.secrets.get("AUDIO_STREAM_PORT", 8502))
+AUDIO_STREAM_PUBLIC_URL = st.secrets.get("AUDIO_STREAM_PUBLIC_URL", f"http://localhost:{AUDIO_STREAM_PORT}")
+if AUDIO_DELIVERY not in AUDIO_DELIVERY_MODES:
+    st.error(f"Unknown AUDIO_DELIVERY {AUDIO_DELIVERY!r}")
+    st.stop()
+
+@st.cache_resource
+def get_presigned_url_cache():
+    """Presigned audio URLs, shared by every session so repeat plays reuse the same URL"""
+    return PresignedUrlCache(s3, BUCKET_NAME)
+
+@st.cache_resource
+def get_audio_server():
+    """The audio server of this process, sharing the S3 object cache with the app"""
+    server = AudioServer(s3, BUCKET_NAME, get_s3_object_cache(), public_url=AUDIO_STREAM_PUBLIC_URL,
+                         port=AUDIO_STREAM_PORT)
+    server.start()
+    atexit.register(server.stop)
+    return server
+
+@st.cache_resource
+def get_credential_store():
+    """Compiled group credentials, loaded once per server process"""
+    return CredentialStore(s3, BUCKET_NAME)
+
+# Session state a refresh or reconnect restores (see session_resume.py)
+RESUMED_STATE_KEYS = (
+    "student", "group", "original_student", "student_s3_prefix", "student_progress", "persisted_answers",
+    "progress_days_loaded", "completed_days", "answers", "pending_progress", "pending_since", "current_day",
+    "question_page", "day_started", "day_scores", "all_time_scores", "practice_done", "opening_audio_played",
+    "transition_audio_played",
+)
+RESUMED_PACKS_KEY = "day_packs"
+
+@st.cache_resource
+def get_hydrated_state_cache():
+    """Logged-in students' session state, shared by every session of this process"""
+    return HydratedStateCache(shared_keys=(RESUMED_PACKS_KEY,))
+
+@st.cache_resource
+def _resume_token_secret():
+    # Without a configured secret, resume tokens only work until the app restarts
+    return st.secrets.get("RESUME_TOKEN_SECRET") or secrets.token_urlsafe(32)
+
+@st.cache_resource
+def get_pack_stats():
+    """Size and parse time of the activity packs this process has read"""
+    return ProgressStats()
+
+def _reconcile_session_progress(other_progress):
+    """Fold progress saved by another tab or device into this session"""
+    merged_progress = merge_progress(other_progress, st.session_state.student_progress)
+    st.session_state.student_progress = merged_progress
+    for day, data in other_progress.items():
+        if not day.startswith("_"):
+            _update_day_answers(st.session_state.persisted_answers, day, data.get("answers", []))
+    for day, data in merged_progress.items():
+        if day.startswith("_"):
+            continue
+        _update_day_answers(st.session_state.answers, day, data.get("answers", []))
+        if data.get("completed", False):
+            st.session_state.completed_days.add(day)
+
+def sync_session_progress():
+    """Pick up answers other tabs or devices saved, once the progress store has seen them"""
+    if "student_s3_prefix" not in st.session_state:
+        return
+    version, progress = get_progress_store().known_progress(
+        st.session_state.student_s3_prefix, since_version=st.session_state.progress_seen_version
+    )
+    if progress is not None:
+        _reconcile_session_progress(progress)
+    st.session_state.progress_seen_version = version
+
 # Safe save student progress to S3
 def save_student_progress(student_s3_prefix, progress_data):
-    """Save student progress to S3 as JSON - SAFE VERSION"""
-    try:
-        progress_key = f"{student_s3_prefix}/progress.json"
-        
-        # CRITICAL: Load existing progress first
+    """Journal progress changes locally; the background writer merges them into S3"""
+    progress_writer = get_progress_writer()
+    if progress_writer is not None:
         try:
-            existing_response = s3.get_object(Bucket=BUCKET_NAME, Key=progress_key)
-            existing_content = existing_response['Body'].read()
-            existing_progress = json.loads(existing_content.decode('utf-8')) if existing_content else {}
-        except:
-            existing_progress = {}
-        
-        # Merge with new data (new data takes precedence for conflicts)
-        merged_progress = existing_progress.copy()
-        
-        # Update with new progress data
-        for day, data in progress_data.items():
-            if day not in merged_progress:
-                merged_progress[day] = data
-            else:
-                # Merge the day's data
-                if "answers" in data:
-                    if "answers" not in merged_progress[day]:
-                        merged_progress[day]["answers"] = {}
-                    merged_progress[day]["answers"].update(data["answers"])
-                
-                # Update completed status and timestamp
-                if data.get("completed", False):
-                    merged_progress[day]["completed"] = True
-                if "last_updated" in data:
-                    merged_progress[day]["last_updated"] = data["last_updated"]
-        
-        # Save current day
-        if "_current_day" in progress_data:
-            merged_progress["_current_day"] = progress_data["_current_day"]
-        
-        # Save the merged data
-        progress_json = json.dumps(merged_progress, indent=2)
-        
-        s3.put_object(
-            Bucket=BUCKET_NAME,
-            Key=progress_key,
-            Body=progress_json.encode('utf-8'),
-            ContentType='application/json'
-        )
+            progress_writer.submit(student_s3_prefix, progress_data)
+            return True
+        except Exception:
+            pass
+    
+    # No local journal, or it can't be written - save straight to S3 instead
+    try:
+        get_progress_store().save(student_s3_prefix, progress_data)
         return True
     except Exception as e:
         st.error(f"Error saving progress: {str(e)}")
@@ -197,70 +429,201 @@ def save_student_progress(student_s3_prefix, progress_data):
 
 # Load student progress from S3
 def load_student_progress(student_s3_prefix):
-    """Load student progress from S3"""
+    """Load student progress from S3, including saves still waiting in the background writer"""
     try:
-        progress_key = f"{student_s3_prefix}/progress.json"
-        response = s3.get_object(Bucket=BUCKET_NAME, Key=progress_key)
-        content = response['Body'].read()
-        if content:
-            return json.loads(content.decode('utf-8'))
-        return None
-    except:
+        progress = get_progress_store().load(student_s3_prefix)
+    except Exception:
         return None
+    progress_writer = get_progress_writer()
+    if progress_writer is not None:
+        for progress_data in progress_writer.pending_progress(student_s3_prefix):
+            progress = merge_progress(progress, progress_data)
+    return progress or None
+
+def load_progress_days(days):
+    """Bring earlier days' answers into the session on first use - login only reads the current day"""
+    if "student_s3_prefix" not in st.session_state:
+        return
+    for day in days:
+        if day in st.session_state.progress_days_loaded:
+            continue
+        try:
+            day_progress = get_progress_store().load_day(st.session_state.student_s3_prefix, day)
+        except Exception:
+            # Try again on the next rerun
+            continue
+        st.session_state.progress_days_loaded.add(day)
+        if day_progress:
+            _reconcile_session_progress({day: day_progress})
+
+# Answers are kept per day as a list indexed by the question's position in the day
+def get_answer(day, index, default=None):
+    """Return the student's answer to a question of the day, or default if not answered"""
+    value = get_slot(st.session_state.answers.get(day, []), index)
+    return default if value is None else value
+
+def set_answer(day, index, value):
+    set_slot(st.session_state.answers.setdefault(day, []), index, value)
+
+def _update_day_answers(answers_by_day, day, day_answers):
+    """Copy the given answers of a day into {day: [answers]}, leaving unanswered slots alone"""
+    for index, value in enumerate(day_answers):
+        if value is not None:
+            set_slot(answers_by_day.setdefault(day, []), index, value)
+
+def _day_answers(day, answers):
+    """Return {question index: answer} for the answered questions of the given day"""
+    return {index: value for index, value in enumerate(answers.get(day, [])) if value is not None}
+
+# Buffered answers are written once this many seconds have passed or this many answers are waiting
+PROGRESS_FLUSH_INTERVAL_SECONDS = 20
+PROGRESS_FLUSH_MAX_ANSWERS = 8
 
 # Safe update progress data
-def update_progress_data(current_day, answers, completed=False):
-    """Update the student's progress data - SAFE VERSION that doesn't overwrite"""
+def update_progress_data(current_day, answers, completed=False, flush=False, score=None):
+    """Update the student's progress data in memory and buffer the change for the next S3 write
+
+    score is the day's score summary (see score_day), saved when the day is completed.
+    """
     if "student_progress" not in st.session_state:
         st.session_state.student_progress = {}
     
-    # CRITICAL: Always load existing progress first to avoid overwriting
-    if "student_s3_prefix" in st.session_state:
-        existing_progress = load_student_progress(st.session_state.student_s3_prefix)
-        if existing_progress:
-            # Merge existing progress with current session state
-            for day, data in existing_progress.items():
-                if day not in st.session_state.student_progress:
-                    st.session_state.student_progress[day] = data
-                else:
-                    # Merge answers from existing progress
-                    if "answers" in data:
-                        if "answers" not in st.session_state.student_progress[day]:
-                            st.session_state.student_progress[day]["answers"] = {}
-                        # Only update answers that don't exist in session state
-                        for key, value in data["answers"].items():
-                            if key not in st.session_state.student_progress[day]["answers"]:
-                                st.session_state.student_progress[day]["answers"][key] = value
-                    # Preserve completed status
-                    if data.get("completed", False):
-                        st.session_state.student_progress[day]["completed"] = True
+    # answers is {question index: answer} for current_day
+    answers = (answers or {}) if current_day else {}
+    
+    # Drop answers whose value is already saved or already waiting to be saved
+    pending_answers = st.session_state.pending_progress.get(current_day, {}).get("answers", [])
+    persisted_answers = st.session_state.persisted_answers.get(current_day, [])
+    changed_answers = {}
+    for index, value in answers.items():
+        known_value = get_slot(pending_answers, index)
+        if known_value is None:
+            known_value = get_slot(persisted_answers, index)
+        if known_value != value:
+            changed_answers[index] = value
+    skipped = len(answers) - len(changed_answers)
+    if skipped:
+        get_progress_stats().incr("answer_writes_skipped", skipped)
+    answers = changed_answers
+    
+    # Nothing new to record - rerunning the page shouldn't cost any I/O
+    if (not answers and not completed and score is None
+            and current_day in st.session_state.student_progress
+            and st.session_state.student_progress.get("_current_day") == st.session_state.current_day):
+        if flush:
+            return flush_progress()
+        return flush_progress_if_due()
+    
+    # Every change is stamped with when and by which session it was made
+    write_stamp = [time.time(), st.session_state.session_id]
     
     # Save current day
-    st.session_state.student_progress["_current_day"] = st.session_state.current_day
+    if st.session_state.student_progress.get("_current_day") != st.session_state.current_day:
+        st.session_state.student_progress["_current_day"] = st.session_state.current_day
+        st.session_state.student_progress["_current_day_stamp"] = write_stamp
     
     if current_day:
         # Initialize day data if not exists
         if current_day not in st.session_state.student_progress:
             st.session_state.student_progress[current_day] = {
-                "answers": {},
+                "answers": [],
+                "answer_meta": [],
                 "completed": False,
                 "last_updated": time.strftime("%Y-%m-%d %H:%M:%S")
             }
         
+        # Remember what changed since the last write
+        pending_day = st.session_state.pending_progress.setdefault(
+            current_day, {"answers": [], "answer_meta": [], "completed": False}
+        )
+        if st.session_state.pending_since is None:
+            st.session_state.pending_since = time.time()
+        
         # Update answers for the day
         if answers:
-            if "answers" not in st.session_state.student_progress[current_day]:
-                st.session_state.student_progress[current_day]["answers"] = {}
-            st.session_state.student_progress[current_day]["answers"].update(answers)
+            day_record = st.session_state.student_progress[current_day]
+            for index, value in answers.items():
+                set_slot(day_record.setdefault("answers", []), index, value)
+                set_slot(day_record.setdefault("answer_meta", []), index, write_stamp)
+                set_slot(pending_day["answers"], index, value)
+                set_slot(pending_day["answer_meta"], index, write_stamp)
         
-        st.session_state.student_progress[current_day]["last_updated"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        if answers or completed:
+            st.session_state.student_progress[current_day]["last_updated"] = time.strftime("%Y-%m-%d %H:%M:%S")
         
         if completed:
             st.session_state.student_progress[current_day]["completed"] = True
+            pending_day["completed"] = True
         
-        # Save to S3
-        if "student_s3_prefix" in st.session_state:
-            save_student_progress(st.session_state.student_s3_prefix, st.session_state.student_progress)
+        if score is not None:
+            st.session_state.student_progress[current_day]["score"] = score
+            pending_day["score"] = score
+    
+    if flush:
+        return flush_progress()
+    return flush_progress_if_due()
+
+# Small "saving/saved" note driven by the background writer
+def show_save_status():
+    # Also the place where answers that waited long enough get written
+    flush_progress_if_due()
+    progress_writer = get_progress_writer()
+    if "student_s3_prefix" not in st.session_state or progress_writer is None:
+        return
+    status = progress_writer.status(st.session_state.student_s3_prefix)
+    if status["failed"]:
+        st.caption("💾 Saved on this device - syncing…")
+    elif status["pending"] or st.session_state.pending_progress:
+        st.caption("💾 Saving…")
+    elif status["saved_at"]:
+        st.caption("✅ Saved")
+
+# Refresh on its own where Streamlit supports fragments
+if hasattr(st, "fragment"):
+    show_save_status = st.fragment(run_every=2)(show_save_status)
+
+# Write buffered progress to S3
+def flush_progress():
+    """Send every buffered change to S3 in one save"""
+    if "student_s3_prefix" not in st.session_state:
+        return True
+    if not st.session_state.pending_progress:
+        return True
+    
+    # Only the changed answers are sent - save_student_progress merges them into the stored file
+    progress_delta = {"_schema": PROGRESS_SCHEMA, "_current_day": st.session_state.current_day}
+    if st.session_state.student_progress.get("_current_day_stamp"):
+        progress_delta["_current_day_stamp"] = st.session_state.student_progress["_current_day_stamp"]
+    for day, pending_day in st.session_state.pending_progress.items():
+        progress_delta[day] = {
+            "answers": list(pending_day["answers"]),
+            "answer_meta": list(pending_day["answer_meta"]),
+            "completed": pending_day["completed"],
+            "last_updated": st.session_state.student_progress.get(day, {}).get("last_updated", time.strftime("%Y-%m-%d %H:%M:%S"))
+        }
+        if "score" in pending_day:
+            progress_delta[day]["score"] = pending_day["score"]
+    
+    if save_student_progress(st.session_state.student_s3_prefix, progress_delta):
+        # Keep the buffer on failure so the next flush retries it
+        for day, pending_day in st.session_state.pending_progress.items():
+            _update_day_answers(st.session_state.persisted_answers, day, pending_day["answers"])
+        st.session_state.pending_progress = {}
+        st.session_state.pending_since = None
+        return True
+    return False
+
+def flush_progress_if_due():
+    """Flush buffered progress when enough answers are waiting or they have waited long enough"""
+    if not st.session_state.pending_progress:
+        return True
+    pending_answers = sum(
+        sum(value is not None for value in day["answers"]) for day in st.session_state.pending_progress.values()
+    )
+    waited = time.time() - (st.session_state.pending_since or time.time())
+    if pending_answers >= PROGRESS_FLUSH_MAX_ANSWERS or waited >= PROGRESS_FLUSH_INTERVAL_SECONDS:
+        return flush_progress()
+    return True
 
 # Helper function to scroll to top
 def scroll_to_top():
@@ -270,78 +633,187 @@ def scroll_to_top():
     </script>
     """, unsafe_allow_html=True)
 
-# Helper function to read files from S3
-def read_s3_file(s3_key):
-    """Read a file from S3 and return its content"""
-    # Check if already cached in session state
-    cache_key = f"_s3_file_cache_{s3_key}"
-    if cache_key in st.session_state:
-        return st.session_state[cache_key]
-    
+def _download_s3_file(s3_key):
     try:
         response = s3.get_object(Bucket=BUCKET_NAME, Key=s3_key)
-        content = response['Body'].read()
-        # Cache small files only (less than 10MB)
-        if len(content) < 10 * 1024 * 1024:
-            st.session_state[cache_key] = content
-        return content
+        return response['Body'].read()
     except ClientError:
         return None
 
+# Helper function to read files from S3
+def read_s3_file(s3_key):
+    """Read a file from S3 and return its content"""
+    # Shared across all sessions; files of 10MB or more are not cached
+    return get_s3_object_cache().get_or_load(s3_key, partial(_download_s3_file, s3_key))
+
+class DayPacks:
+    """A student's activity packs by day, each read and parsed the first time it is needed
+
+    Login only lists the day folders; a session holds just the packs of the days it touches.
+    """
+
+    def __init__(self, student_s3_prefix, days):
+        self.student_s3_prefix = student_s3_prefix
+        self.days = days
+        self._packs = {}
+
+    def pack_key(self, day):
+        return f"{self.student_s3_prefix}/{day}/activity_pack.json"
+
+    def get(self, day, default=None):
+        if day not in self.days:
+            return default
+        if day not in self._packs:
+            content = read_s3_file(self.pack_key(day))
+            # A missing pack is remembered too, so it is not asked for on every rerun
+            self._packs[day] = decode_json(content, get_pack_stats()) if content else None
+        pack = self._packs[day]
+        return default if pack is None else pack
+
+    def __contains__(self, day):
+        return self.get(day) is not None
+
+    def __getitem__(self, day):
+        pack = self.get(day)
+        if pack is None:
+            raise KeyError(day)
+        return pack
+
+    def preload(self, day, pack):
+        """Keep a pack parsed elsewhere (see prefetch_next_day), unless the day is already loaded"""
+        self._packs.setdefault(day, pack)
+
+    def next_day(self, day):
+        if day not in self.days:
+            return None
+        index = self.days.index(day)
+        return self.days[index + 1] if index + 1 < len(self.days) else None
+
+    def loaded_days(self):
+        return [day for day, pack in self._packs.items() if pack is not None]
+
+# Questions shown per page of a day
+QUESTIONS_PER_PAGE = 2
+# Background threads warming the S3 object cache ahead of the student
+PREFETCH_WORKERS = 4
+
+def day_session_content(pack):
+    """Return the content of the pack's structured literacy session, or None"""
+    for field in pack.get('fields', []):
+        if field.get('type') == 'enhanced_structured_literacy_session':
+            return field.get('content', {})
+    return None
+
+def day_questions(content):
+    """Return [(activity, index within the activity, question)] in the order the pages show them"""
+    all_questions = []
+    for activity in content.get('activities', []):
+        for idx, q in enumerate(activity.get('questions', [])):
+            all_questions.append((activity, idx, q))
+    return all_questions
+
+def page_audio_keys(content, student_s3_prefix, day, page):
+    """Return the S3 keys of the audio a page of the day can play"""
+    audio_files = []
+    start_idx = page * QUESTIONS_PER_PAGE
+    for activity, local_idx, q in day_questions(content)[start_idx:start_idx + QUESTIONS_PER_PAGE]:
+        if local_idx == 0:
+            audio_files += [activity.get('tutor_intro_audio_file'), activity.get('teaching_audio'),
+                            activity.get('multisensory_audio'), activity.get('story_audio_file')]
+        audio_files += [q.get('prompt_audio_file'), q.get('feedback_audio_file'), q.get('dictation_audio_file')]
+        audio_files += [option.get('audio_file') for option in q.get('options', []) if isinstance(option, dict)]
+        # The model paragraph shown once the last question of a Paragraph Writing activity is answered
+        if (activity.get('component') == 'Paragraph Writing'
+                and local_idx == len(activity.get('questions', [])) - 1):
+            audio_files.append(activity.get('final_display', {}).get('audio_file'))
+    keys = []
+    for audio_file in audio_files:
+        key = fix_audio_path(audio_file, student_s3_prefix, day)
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+@st.cache_resource
+def get_prefetch_executor():
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+def _prefetch_s3_file(cache, s3_key):
+    cache.get_or_load(s3_key, partial(_download_s3_file, s3_key))
+
+def prefetch_s3_files(s3_keys):
+    """Read the keys into the shared S3 object cache on the prefetch pool, several at a time"""
+    cache = get_s3_object_cache()
+    executor = get_prefetch_executor()
+    for key in s3_keys:
+        executor.submit(_prefetch_s3_file, cache, key)
+
+def prefetch_page_audio(content, student_s3_prefix, day, page, opening=False):
+    """Warm the audio of a page and of the page after it, and the opening audio if asked
+
+    Each is sent to the prefetch pool once per session, so the 🔊 and Teach Me clicks play
+    from the S3 object cache instead of waiting for a GET. Presigned audio never passes
+    through the app, so there is nothing to warm.
+    """
+    if AUDIO_DELIVERY == "presigned":
+        return
+    keys = []
+    if opening and (day, "opening") not in st.session_state.prefetched_audio:
+        st.session_state.prefetched_audio.add((day, "opening"))
+        keys.append(fix_audio_path(content.get('opening_audio_file', ''), student_s3_prefix, day))
+    for audio_page in (page, page + 1):
+        if (day, audio_page) not in st.session_state.prefetched_audio:
+            st.session_state.prefetched_audio.add((day, audio_page))
+            keys += page_audio_keys(content, student_s3_prefix, day, audio_page)
+    prefetch_s3_files([key for key in keys if key])
+
+def _prefetch_day(cache, pack_stats, executor, day_packs, day):
+    """Runs on a prefetch thread: the day's pack first, then its opening and first-page audio"""
+    pack_key = day_packs.pack_key(day)
+    content = cache.get_or_load(pack_key, partial(_download_s3_file, pack_key))
+    if not content:
+        return
+    pack = decode_json(content, pack_stats)
+    day_packs.preload(day, pack)
+    session_content = day_session_content(pack)
+    if session_content is None or AUDIO_DELIVERY == "presigned":
+        return
+    audio_keys = [fix_audio_path(session_content.get('opening_audio_file', ''), day_packs.student_s3_prefix, day)]
+    audio_keys += page_audio_keys(session_content, day_packs.student_s3_prefix, day, 0)
+    for key in audio_keys:
+        if key:
+            executor.submit(_prefetch_s3_file, cache, key)
+
+def prefetch_next_day(day_packs, current_day):
+    """Start warming the next day in the background, once per day and session
+
+    Called from the last page of a day, so Complete Day and the next day's start screen and
+    first page find what they need in the S3 object cache.
+    """
+    next_day = day_packs.next_day(current_day)
+    if next_day is None or next_day in st.session_state.prefetched_days:
+        return
+    st.session_state.prefetched_days.add(next_day)
+    # Best effort - whatever is not warmed is read when it is needed, as before
+    executor = get_prefetch_executor()
+    executor.submit(_prefetch_day, get_s3_object_cache(), get_pack_stats(), executor, day_packs, next_day)
+
 # Get all students - hidden from UI
-def _get_all_students():
-    # Check if already cached in session state
-    if "_all_students_cache" in st.session_state:
-        return st.session_state._all_students_cache
-    
-    student_to_group = {}
-    base_prefix = "Summer_Activities/"
-    
+@st.cache_resource(max_entries=4, ttl=S3_CACHE_TTL_SECONDS)
+def _build_roster_index(content):
+    """One index per roster manifest, shared by every session"""
+    if content:
+        return RosterIndex.from_roster(decode_json(content))
+    # No manifest yet (see manage_roster.py) - work it out from the bucket
+    return RosterIndex(list_students(s3, BUCKET_NAME))
+
+def get_roster_index():
+    """Return the roster as a RosterIndex; only called once a student starts typing their name"""
     try:
-        paginator = s3.get_paginator('list_objects_v2')
-        all_objects = []
-        page_iterator = paginator.paginate(
-            Bucket=BUCKET_NAME,
-            Prefix=base_prefix
-        )
-        
-        for page in page_iterator:
-            if 'Contents' in page:
-                all_objects.extend(page['Contents'])
-        
-        for obj in all_objects:
-            key = obj['Key']
-            relative_key = key[len(base_prefix):] if key.startswith(base_prefix) else key
-            parts = relative_key.split('/')
-            
-            if len(parts) >= 2:
-                group = parts[0]
-                student = parts[1]
-                
-                if not group or not student:
-                    continue
-                
-                if len(parts) == 2 and '.' in student:
-                    continue
-                
-                if (student.endswith('_passwords.txt') or 
-                    student.endswith('.json') or
-                    student == "passwords.json" or
-                    '.txt' in student or
-                    '.json' in student):
-                    continue
-                
-                if len(parts) >= 3:
-                    if student not in student_to_group:
-                        student_to_group[student] = group
-        
-        # Cache in session state
-        st.session_state._all_students_cache = student_to_group
-        return student_to_group
-        
+        # One GET, shared by every session through the S3 object cache
+        return _build_roster_index(read_s3_file(ROSTER_KEY))
     except Exception as e:
         st.error("Error loading students")
-        return {}
+        return RosterIndex({})
 
 # Fix audio paths
 def fix_audio_path(audio_file, student_s3_prefix, current_day):
@@ -353,74 +825,33 @@ def fix_audio_path(audio_file, student_s3_prefix, current_day):
         return f"{student_s3_prefix}/{current_day}/{audio_file}"
 
 # Load passwords - hidden function
-def _load_passwords(group_folder):
-    # Check if already cached in session state
-    cache_key = f"_passwords_cache_{group_folder}"
-    if cache_key in st.session_state:
-        return st.session_state[cache_key]
-    
-    passwords = {}
-    
-    group_password_key = f"Summer_Activities/{group_folder}/{group_folder}_passwords.txt"
-    txt_content = read_s3_file(group_password_key)
-    
-    if txt_content:
-        lines = txt_content.decode('utf-8').strip().split('\n')
-        
-        for line in lines:
-            if ':' in line and not line.startswith('=') and not line.startswith('GROUP'):
-                parts = line.split(':')
-                if len(parts) == 2:
-                    student_name = parts[0].strip()
-                    password = parts[1].strip()
-                    passwords[student_name] = password
-                    passwords[student_name.lower()] = password
-    
+def _load_credentials(group_folder):
+    """Return the group's compiled credentials; at most one GET, shared by every session"""
+    version = get_roster_index().credentials.get(group_folder)
     try:
-        response = s3.list_objects_v2(
-            Bucket=BUCKET_NAME,
-            Prefix=f"Summer_Activities/{group_folder}/",
-            MaxKeys=100
-        )
-        
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                key = obj['Key']
-                if key.endswith('_passwords.txt') and not key.endswith(f'{group_folder}_passwords.txt'):
-                    filename = key.split('/')[-1]
-                    student_name = filename.replace('_passwords.txt', '')
-                    
-                    txt_content = read_s3_file(key)
-                    if txt_content:
-                        simple_password = txt_content.decode('utf-8').strip()
-                        passwords[student_name] = simple_password
-                        passwords[student_name.lower()] = simple_password
-    
+        return get_credential_store().get(group_folder, version)
     except ClientError:
-        pass
-    
-    if not passwords:
-        password_json_key = f"Summer_Activities/{group_folder}/passwords.json"
-        content = read_s3_file(password_json_key)
-        if content:
-            try:
-                passwords = json.loads(content.decode('utf-8'))
-            except json.JSONDecodeError:
-                pass
-    
-    # Cache in session state
-    st.session_state[cache_key] = passwords
-    return passwords
+        return {}
+
+def audio_source(s3_key):
+    """Return the src attribute for an <audio> element playing the key, or None when there is no such audio"""
+    if AUDIO_DELIVERY == "presigned":
+        return html.escape(get_presigned_url_cache().url(s3_key))
+    if AUDIO_DELIVERY == "stream":
+        return html.escape(get_audio_server().url(s3_key))
+    audio_content = read_s3_file(s3_key)
+    if not audio_content:
+        return None
+    return f"data:audio/mp3;base64,{base64.b64encode(audio_content).decode()}"
 
 # Play audio with autoplay
 def play_audio_with_autoplay(s3_key, element_id="opening-audio"):
     """Play audio with autoplay attempt and fallback button"""
-    audio_content = read_s3_file(s3_key)
-    if audio_content:
-        b64 = base64.b64encode(audio_content).decode()
+    src = audio_source(s3_key)
+    if src:
         audio_html = f"""
         <audio id="{element_id}" autoplay>
-            <source src="data:audio/mp3;base64,{b64}" type="audio/mp3">
+            <source src="{src}" type="audio/mp3">
         </audio>
         <script>
             window.addEventListener('load', function() {{
@@ -451,43 +882,59 @@ def play_audio_with_autoplay(s3_key, element_id="opening-audio"):
         st.markdown(audio_html, unsafe_allow_html=True)
 
 # Play audio hidden - fixed for multiple consecutive plays
-def play_audio_hidden(s3_key, audio_key=None):
-    """Play audio with proper handling for multiple plays"""
+def play_audio_hidden(s3_key):
+    """Have the page's audio player play the clip once this run has finished"""
+    st.session_state.audio_play_queue.append(s3_key)
+
+# One player per page (audio_player/index.html); it keeps the clips it has been sent
+_audio_player = components.declare_component(
+    "audio_player", path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio_player")
+)
+AUDIO_PLAYER_KEY = "audio_player"
+
+def _audio_clip(s3_key):
+    """Return {"id", "src"} for the player - for inline clips, src only when the player doesn't hold the clip yet"""
+    if AUDIO_DELIVERY != "inline":
+        # A URL the browser plays and caches itself; it is small, so it is sent every time
+        src = audio_source(s3_key)
+        return {"id": s3_key, "src": html.unescape(src)} if src else None
     audio_content = read_s3_file(s3_key)
-    if audio_content:
-        b64 = base64.b64encode(audio_content).decode()
-        
-        # Create unique ID with timestamp to allow replay
-        timestamp = str(time.time()).replace('.', '')
-        unique_id = f"{audio_key}_{timestamp}" if audio_key else timestamp
-        
-        # Create a placeholder for audio
-        audio_placeholder = st.empty()
-        
-        # Use the placeholder to render audio
-        with audio_placeholder:
-            st.markdown(f"""
-            <audio id="audio_{unique_id}" autoplay>
-                <source src="data:audio/mp3;base64,{b64}" type="audio/mp3">
-            </audio>
-            <script>
-                (function() {{
-                    var audio = document.getElementById('audio_{unique_id}');
-                    if (audio) {{
-                        audio.play().catch(function(e) {{
-                            console.log('Audio play error:', e);
-                        }});
-                    }}
-                }})();
-            </script>
-            """, unsafe_allow_html=True)
+    if not audio_content:
+        return None
+    # Keyed by content too, so a replaced file isn't played from the old copy
+    clip_id = f"{s3_key}#{hashlib.md5(audio_content).hexdigest()}"
+    if clip_id in st.session_state.audio_clips_sent:
+        return {"id": clip_id, "src": None}
+    src = audio_source(s3_key)
+    if not src:
+        return None
+    st.session_state.audio_clips_sent[clip_id] = s3_key
+    # audio_source escapes for HTML attributes; the player takes the URL as it is
+    return {"id": clip_id, "src": html.unescape(src)}
+
+def render_audio_player(slot):
+    """Send what this run asked to play to the page's audio player, in the slot kept for it"""
+    # Clips the player reports it no longer has (its frame was reloaded) are sent again
+    reported = st.session_state.get(AUDIO_PLAYER_KEY) or {}
+    if reported.get("missing") and reported.get("nonce") != st.session_state.audio_missing_nonce:
+        st.session_state.audio_missing_nonce = reported.get("nonce")
+        for clip_id in reported["missing"]:
+            s3_key = st.session_state.audio_clips_sent.pop(clip_id, None)
+            if s3_key:
+                st.session_state.audio_play_queue.append(s3_key)
+    
+    clips = [clip for clip in map(_audio_clip, st.session_state.audio_play_queue) if clip]
+    st.session_state.audio_play_queue = []
+    if clips:
+        st.session_state.audio_play_nonce += 1
+    with slot:
+        _audio_player(clips=clips, nonce=st.session_state.audio_play_nonce, key=AUDIO_PLAYER_KEY, default=None)
 
 # Play story with highlight
 def play_story_with_highlight(story_text, audio_s3_key):
     """Play story audio with synchronized text highlighting"""
-    audio_content = read_s3_file(audio_s3_key)
-    if audio_content:
-        b64 = base64.b64encode(audio_content).decode()
+    src = audio_source(audio_s3_key)
+    if src:
         words = story_text.split()
         word_duration = 0.3
         
@@ -498,7 +945,7 @@ def play_story_with_highlight(story_text, audio_s3_key):
             </p>
         </div>
         <audio id="story-audio" autoplay>
-            <source src="data:audio/mp3;base64,{b64}" type="audio/mp3">
+            <source src="{src}" type="audio/mp3">
         </audio>
         <script>
             var audio = document.getElementById('story-audio');
@@ -582,8 +1029,70 @@ def is_valid_dictation_answer(user_answer, correct_answer):
     else:
         return False, "Please try again or type 'I don't know'"
 
+# Scoring
+def is_correct_answer(question, user_answer):
+    """Grade one answer - text inputs count as correct once answered, dictation has to be close enough"""
+    if question.get('answer_type') == 'single_select':
+        return user_answer == question.get('correct_answer')
+    if question.get('answer_type') == 'text_input' and user_answer:
+        if question.get('question_type') == 'text_input_dictation':
+            return is_valid_dictation_answer(user_answer, question.get('correct_answer', ''))[0] or user_answer.lower() == "i don't know"
+        return True
+    return False
+
+def score_day(day, day_data):
+    """Score the student's answers for a day
+
+    Returns {"correct", "total", "activities": {"activity_<number>": {"correct", "total", "component"}}}.
+    """
+    activities = {}
+    for field in day_data['fields']:
+        if field.get('type') != 'enhanced_structured_literacy_session':
+            continue
+        global_idx = 0
+        for activity in field.get('content', {}).get('activities', []):
+            correct = 0
+            total = 0
+            for q in activity.get('questions', []):
+                total += 1
+                if is_correct_answer(q, get_answer(day, global_idx)):
+                    correct += 1
+                global_idx += 1
+            activities[f"activity_{activity.get('activity_number', '')}"] = {
+                'correct': correct,
+                'total': total,
+                'component': activity.get('component', '')
+            }
+    return {
+        'correct': sum(activity['correct'] for activity in activities.values()),
+        'total': sum(activity['total'] for activity in activities.values()),
+        'activities': activities
+    }
+
+def completed_day_scores(day_to_content):
+    """Return {day: score} for the completed days
+
+    Days are scored when they are completed. Days completed before scores were saved are
+    scored once here, and the score is saved with them.
+    """
+    scores = {}
+    for day in sorted(st.session_state.completed_days):
+        score = st.session_state.student_progress.get(day, {}).get("score")
+        if score is None and day in day_to_content:
+            load_progress_days([day])
+            if day not in st.session_state.progress_days_loaded:
+                continue
+            score = score_day(day, day_to_content[day])
+            update_progress_data(day, {}, score=score)
+        if score:
+            scores[day] = score
+    return scores
+
+def _day_number(day):
+    return int(day.replace("day", ""))
+
 # Create a beautiful combined progress chart with graph
-def create_combined_progress_chart(activities_data, all_days_progress=None):
+def create_combined_progress_chart(activities_data, day_scores=None):
     """Create a visually appealing combined progress visualization with proper plots"""
     if not activities_data:
         return
@@ -656,9 +1165,13 @@ def create_combined_progress_chart(activities_data, all_days_progress=None):
     """, unsafe_allow_html=True) 
     st.markdown("### 📊 Progress Over Time")
     
+    all_days_progress = {
+        day: score['correct'] / score['total'] * 100
+        for day, score in (day_scores or {}).items() if score.get('total')
+    }
     if all_days_progress and len(all_days_progress) > 0:
         # Prepare data for plotting
-        days = sorted(all_days_progress.keys())
+        days = sorted(all_days_progress.keys(), key=_day_number)
         day_labels = [day.replace('day', 'Day ') for day in days]
         percentages = [all_days_progress[day] for day in days]
         
@@ -783,9 +1296,7 @@ def create_combined_progress_chart(activities_data, all_days_progress=None):
         
         # Optional: Add a secondary chart showing activity breakdown over days
         if st.checkbox("Show detailed activity breakdown", value=False):
-            # This would require storing activity-level data for each day
-            # For now, showing a placeholder message
-            st.info("Activity-level tracking will be available in future updates!")
+            create_activity_breakdown_chart(day_scores, days)
             
     else:
         st.info("Complete more days to see your progress over time!")
@@ -822,6 +1333,65 @@ def create_combined_progress_chart(activities_data, all_days_progress=None):
         
         st.plotly_chart(fig_example, use_container_width=True)
 
+# Score of each kind of activity over the completed days
+def create_activity_breakdown_chart(day_scores, days):
+    """Plot one line per activity component, from the scores saved with each completed day"""
+    day_labels = [day.replace('day', 'Day ') for day in days]
+    component_totals = {}
+    for day in days:
+        for activity in day_scores[day].get('activities', {}).values():
+            component = activity.get('component') or 'Other'
+            correct, total = component_totals.setdefault(component, {}).get(day, (0, 0))
+            component_totals[component][day] = (correct + activity['correct'], total + activity['total'])
+    
+    if not component_totals:
+        st.info("No activity scores saved yet")
+        return
+    
+    fig = go.Figure()
+    for component, totals in component_totals.items():
+        component_days = [day for day in days if totals.get(day, (0, 0))[1] > 0]
+        fig.add_trace(go.Scatter(
+            x=[day.replace('day', 'Day ') for day in component_days],
+            y=[totals[day][0] / totals[day][1] * 100 for day in component_days],
+            mode='lines+markers',
+            name=component,
+            marker=dict(size=8),
+            hovertemplate=f'<b>{component}</b><br>%{{x}}: %{{y:.0f}}%<extra></extra>'
+        ))
+    
+    fig.update_layout(
+        title=dict(text='Activity Scores by Day', x=0.5, xanchor='center'),
+        xaxis=dict(title='Days', categoryorder='array', categoryarray=day_labels),
+        yaxis=dict(title='Score (%)', range=[0, 105]),
+        plot_bgcolor='rgba(250,250,250,0.8)',
+        legend=dict(orientation='h', yanchor='top', y=-0.2),
+        margin=dict(l=50, r=50, t=80, b=50),
+        height=450
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+# Storage stats - only shown when enabled in secrets
+def show_storage_stats():
+    if not st.secrets.get("SHOW_STORAGE_STATS", False):
+        return
+    st.markdown("---")
+    with st.expander("🔧 Storage stats"):
+        st.markdown("**S3 object cache**")
+        st.json(get_s3_object_cache().stats())
+        st.markdown("**Progress saves**")
+        st.json(get_progress_stats().snapshot())
+        st.markdown("**Activity packs**")
+        st.json(get_pack_stats().snapshot())
+        st.markdown("**Resumable sessions**")
+        st.json(get_hydrated_state_cache().stats())
+        if AUDIO_DELIVERY == "presigned":
+            st.markdown("**Presigned audio URLs**")
+            st.json(get_presigned_url_cache().stats())
+        if "student_s3_prefix" in st.session_state and get_progress_writer() is not None:
+            st.markdown("**Background writer**")
+            st.json(get_progress_writer().status(st.session_state.student_s3_prefix))
+
 # Progress sidebar
 def create_progress_sidebar(all_days, day_to_content, current_day, student_s3_prefix):
     """Create a sidebar with progress tracking"""
@@ -843,88 +1413,9 @@ def create_progress_sidebar(all_days, day_to_content, current_day, student_s3_pr
         if current_day and current_day in day_to_content:
             st.markdown("---")
             
-            day_data = day_to_content[current_day]
-            activities_data = {}
-            
-            for field in day_data['fields']:
-                if field.get('type') == 'enhanced_structured_literacy_session':
-                    content = field.get('content', {})
-                    
-                    for activity in content.get('activities', []):
-                        activity_num = activity.get('activity_number', '')
-                        component = activity.get('component', '')
-                        
-                        correct = 0
-                        total = 0
-                        
-                        for q in activity.get('questions', []):
-                            total += 1
-                            for global_idx, (act, _, question) in enumerate([(a, i, qu) for a in content.get('activities', []) for i, qu in enumerate(a.get('questions', []))]):
-                                if act == activity and question == q:
-                                    answer_key = f"answer_{current_day}_{global_idx}"
-                                    user_answer = st.session_state.answers.get(answer_key)
-                                    
-                                    if q.get('answer_type') == 'single_select':
-                                        if user_answer == q.get('correct_answer'):
-                                            correct += 1
-                                    elif q.get('answer_type') == 'text_input':
-                                        if user_answer:
-                                            # For any text input, count as correct if answered
-                                            # This includes reading comprehension and dictation
-                                            if q.get('question_type') == 'text_input_dictation':
-                                                if is_valid_dictation_answer(user_answer, q.get('correct_answer', ''))[0] or user_answer.lower() == "i don't know":
-                                                    correct += 1
-                                            else:
-                                                # For regular text inputs like reading comprehension, count as correct if answered
-                                                correct += 1
-                        
-                        activities_data[f"activity_{activity_num}"] = {
-                            'correct': correct,
-                            'total': total,
-                            'component': component
-                        }
-            
-            # Calculate progress for all completed days
-            all_days_progress = {}
-            if st.session_state.student_progress:
-                for day in st.session_state.completed_days:
-                    if day in day_to_content:
-                        day_data = day_to_content[day]
-                        day_correct = 0
-                        day_total = 0
-                        
-                        for field in day_data['fields']:
-                            if field.get('type') == 'enhanced_structured_literacy_session':
-                                content = field.get('content', {})
-                                
-                                for activity in content.get('activities', []):
-                                    for q_idx, q in enumerate(activity.get('questions', [])):
-                                        day_total += 1
-                                        # Find the answer for this question
-                                        for global_idx, (act, _, question) in enumerate([(a, i, qu) for a in content.get('activities', []) for i, qu in enumerate(a.get('questions', []))]):
-                                            if act == activity and question == q:
-                                                answer_key = f"answer_{day}_{global_idx}"
-                                                user_answer = st.session_state.answers.get(answer_key)
-                                                
-                                                if q.get('answer_type') == 'single_select':
-                                                    if user_answer == q.get('correct_answer'):
-                                                        day_correct += 1
-                                                elif q.get('answer_type') == 'text_input':
-                                                    if user_answer:
-                                                        # For any text input, count as correct if answered
-                                                        if q.get('question_type') == 'text_input_dictation':
-                                                            if is_valid_dictation_answer(user_answer, q.get('correct_answer', ''))[0] or user_answer.lower() == "i don't know":
-                                                                day_correct += 1
-                                                        else:
-                                                            # For regular text inputs like reading comprehension
-                                                            day_correct += 1
-                                                break
-                        
-                        if day_total > 0:
-                            all_days_progress[day] = (day_correct / day_total) * 100
-            
-            # Create beautiful combined chart with historical data
-            create_combined_progress_chart(activities_data, all_days_progress)
+            # Today's activities are scored live, completed days use the scores saved with them
+            activities_data = score_day(current_day, day_to_content[current_day])["activities"]
+            create_combined_progress_chart(activities_data, completed_day_scores(day_to_content))
         
         # Day status
         st.markdown("---")
@@ -939,6 +1430,8 @@ def create_progress_sidebar(all_days, day_to_content, current_day, student_s3_pr
                 st.markdown(f"✅ {day.replace('day', 'Day ')}")
             else:
                 st.markdown(f"⭕ {day.replace('day', 'Day ')}")
+        
+        show_storage_stats()
 
 # Welcome animation
 def show_welcome_animation(student_name):
@@ -999,79 +1492,156 @@ def show_success_animation(message):
     {confetti_html}
     """, unsafe_allow_html=True)
 
-# Main app
+# Per-question state, kept under keys starting with these
+QUESTION_STATE_PREFIXES = (
+    "answer_", "feedback_", "fb_played_", "dictation_attempts_", "multi_clicked_", "practice_", "story_clicked_",
+)
+
+# Log a student in - also used when a resumed session has nothing cached
+def start_student_session(group, original_student):
+    # Nothing of a student who used this browser session before may carry over
+    for key in [key for key in st.session_state.keys() if key.startswith(QUESTION_STATE_PREFIXES)]:
+        del st.session_state[key]
+    st.session_state.answers = {}
+    st.session_state.completed_days = set()
+    st.session_state.current_day = None
+    st.session_state.question_page = 0
+    st.session_state.day_started = False
+    st.session_state.day_scores = {}
+    st.session_state.all_time_scores = {}
+    st.session_state.practice_done = {}
+    st.session_state.pending_progress = {}
+    st.session_state.pending_since = None
+    st.session_state.progress_seen_version = None
+    st.session_state.opening_audio_played = set()
+    st.session_state.transition_audio_played = set()
+    
+    st.session_state.authenticated = True
+    st.session_state.student = original_student.capitalize()
+    st.session_state.group = group
+    st.session_state.original_student = original_student
+    st.session_state.student_s3_prefix = f"Summer_Activities/{group}/{original_student}"
+    
+    # Load saved progress
+    st.session_state.student_progress = {}
+    st.session_state.persisted_answers = {}
+    st.session_state.progress_days_loaded = set()
+    st.session_state.prefetched_days = set()
+    st.session_state.prefetched_audio = set()
+    saved_progress = load_student_progress(st.session_state.student_s3_prefix)
+    if saved_progress:
+        st.session_state.student_progress = saved_progress
+        # Restore completed days
+        st.session_state.completed_days = set(
+            day for day, data in saved_progress.items() 
+            if not day.startswith("_") and data.get("completed", False)
+        )
+        # Restore all answers
+        for day, day_data in saved_progress.items():
+            if not day.startswith("_") and "answers" in day_data:
+                _update_day_answers(st.session_state.answers, day, day_data["answers"])
+                _update_day_answers(st.session_state.persisted_answers, day, day_data["answers"])
+        
+        # Restore current day
+        if "_current_day" in saved_progress:
+            st.session_state.current_day = saved_progress["_current_day"]
+
+def remember_session_state():
+    """Keep this session's state in the process so a refresh or reconnect can resume it"""
+    student_s3_prefix = st.session_state.student_s3_prefix
+    state = {key: st.session_state[key] for key in RESUMED_STATE_KEYS if key in st.session_state}
+    packs = st.session_state.get(f"_day_packs_cache_{student_s3_prefix}")
+    if packs is not None:
+        state[RESUMED_PACKS_KEY] = packs
+    get_hydrated_state_cache().put(student_s3_prefix, state)
+
+def resume_session():
+    """Log the student back in from the resume token in the page URL, if it is valid"""
+    token = st.query_params.get("resume")
+    if not token:
+        return False
+    claims = read_resume_token(_resume_token_secret(), token)
+    if claims is None or get_hydrated_state_cache().is_revoked(*claims):
+        del st.query_params["resume"]
+        return False
+    
+    student_s3_prefix = claims[0]
+    state = get_hydrated_state_cache().get(student_s3_prefix)
+    if state is None:
+        # Not seen by this process lately - load the student as a login would
+        _, group, original_student = student_s3_prefix.split("/", 2)
+        start_student_session(group, original_student)
+        return True
+    
+    packs = state.pop(RESUMED_PACKS_KEY, None)
+    for key, value in state.items():
+        st.session_state[key] = value
+    if packs is not None:
+        st.session_state[f"_day_packs_cache_{student_s3_prefix}"] = packs
+    st.session_state.authenticated = True
+    # Pick up anything another tab saved since
+    st.session_state.progress_seen_version = None
+    return True
+
 # Main app
 def main():
     st.title("Lerna ReadTogether")
     add_custom_css()
+    
+    # Always at this spot, so the audio player and the clips it holds last as long as the page
+    audio_player_slot = st.empty()
+    # Plays asked for by a run that was cut short by st.rerun are dropped, as before
+    st.session_state.audio_play_queue = []
+    try:
+        show_page()
+    finally:
+        # After this run's answers are in, including runs ended by st.rerun
+        if st.session_state.authenticated and "student_s3_prefix" in st.session_state:
+            remember_session_state()
+    render_audio_player(audio_player_slot)
 
-    student_to_group = _get_all_students()
-
-    if not student_to_group:
-        st.error("No students found in the system")
-        return
+def show_page():
+    if not st.session_state.authenticated:
+        resume_session()
 
     # Login section
     if not st.session_state.authenticated:
         st.header("Student Login")
         
-        student_names = sorted([name.capitalize() for name in student_to_group.keys()])
-        selected_student = st.selectbox("Select Student", student_names)
+        # The roster is only loaded once something is typed, and only matching names are sent
+        original_student = None
+        search = st.text_input("Type the start of your name", key="login_search")
+        if search.strip():
+            roster_index = get_roster_index()
+            if not len(roster_index):
+                st.error("No students found in the system")
+                return
+            matches, more = roster_index.search(search)
+            if matches:
+                original_student = st.selectbox("Select Student", matches, format_func=str.capitalize)
+                if more:
+                    st.caption("Keep typing to see more names")
+            else:
+                st.info("No student names start with that - check the spelling")
         password = st.text_input("Password", type="password")
         
         if st.button("Login", key="login_button"):
-            original_student = None
-            for orig_name in student_to_group.keys():
-                if orig_name.lower() == selected_student.lower():
-                    original_student = orig_name
-                    break
-            
-            if original_student:
-                group = student_to_group[original_student]
-                passwords = _load_passwords(group)
-                
-                possible_names = [
-                    original_student,
-                    original_student.lower(),
-                    original_student.capitalize(),
-                    original_student.upper(),
-                    selected_student,
-                ]
-                
-                password_found = False
-                correct_password = None
-                
-                for name_variant in possible_names:
-                    if name_variant in passwords:
-                        correct_password = passwords[name_variant]
-                        password_found = True
-                        break
+            if original_student is None:
+                st.error("Type your name and select it first")
+            else:
+                selected_student = original_student.capitalize()
+                group = roster_index.group_of(original_student)
+                credentials = _load_credentials(group)
+                # Names are indexed in lower case, so this matches them in any case
+                correct_password = find_password(credentials, original_student)
                 
-                if password_found:
+                if correct_password is not None:
                     if correct_password == password:
-                        st.session_state.authenticated = True
-                        st.session_state.student = selected_student.capitalize()
-                        st.session_state.group = group
-                        st.session_state.original_student = original_student
-                        st.session_state.student_s3_prefix = f"Summer_Activities/{group}/{original_student}"
-                        
-                        # Load saved progress
-                        saved_progress = load_student_progress(st.session_state.student_s3_prefix)
-                        if saved_progress:
-                            st.session_state.student_progress = saved_progress
-                            # Restore completed days
-                            st.session_state.completed_days = set(
-                                day for day, data in saved_progress.items() 
-                                if day != "_current_day" and data.get("completed", False)
-                            )
-                            # Restore all answers
-                            for day, day_data in saved_progress.items():
-                                if day != "_current_day" and "answers" in day_data:
-                                    st.session_state.answers.update(day_data["answers"])
-                            
-                            # Restore current day
-                            if "_current_day" in saved_progress:
-                                st.session_state.current_day = saved_progress["_current_day"]
+                        start_student_session(group, original_student)
+                        # Lets a refresh or reconnect carry on without logging in again
+                        st.query_params["resume"] = make_resume_token(
+                            _resume_token_secret(), st.session_state.student_s3_prefix
+                        )
                         
                         st.balloons()
                         show_welcome_animation(selected_student)
@@ -1086,13 +1656,24 @@ def main():
     else:
         st.write(f"Welcome back, {st.session_state.student}!")
         
+        sync_session_progress()
+        show_save_status()
+        
         if st.button("Logout", key="logout_button"):
             # Save progress before logout
             if "student_s3_prefix" in st.session_state:
-                update_progress_data(st.session_state.get("current_day"), st.session_state.get("answers", {}))
+                logout_day = st.session_state.get("current_day")
+                update_progress_data(logout_day, _day_answers(logout_day, st.session_state.get("answers", {})), flush=True)
+            
+            # Refreshing this or any other tab of the student now shows the login page
+            get_hydrated_state_cache().revoke(st.session_state.student_s3_prefix)
+            if "resume" in st.query_params:
+                del st.query_params["resume"]
             
             # Clear only authentication, not progress
             st.session_state.authenticated = False
+            st.session_state.pending_progress = {}
+            st.session_state.pending_since = None
             st.session_state.audio_containers = {}
             st.session_state.audio_playing = {}
             st.session_state.opening_audio_played = set()
@@ -1110,8 +1691,6 @@ def main():
             if cache_key in st.session_state:
                 return st.session_state[cache_key]
             
-            all_days = []
-            day_to_content = {}
             try:
                 response = s3.list_objects_v2(
                     Bucket=BUCKET_NAME,
@@ -1125,13 +1704,9 @@ def main():
                         if folder_name.startswith("day"):
                             day_folders.append(folder_name)
                 day_folders.sort(key=lambda x: int(x.replace("day", "")))
-                for day_folder in day_folders:
-                    activity_pack_key = f"{student_s3_prefix}/{day_folder}/activity_pack.json"
-                    content = read_s3_file(activity_pack_key)
-                    if content:
-                        data = json.loads(content.decode('utf-8'))
-                        all_days.append(day_folder)
-                        day_to_content[day_folder] = data
+                # Packs are only fetched as days are shown - the current day's first
+                all_days = day_folders
+                day_to_content = DayPacks(student_s3_prefix, all_days)
                 
                 # Cache in session state
                 result = (all_days, day_to_content)
@@ -1172,6 +1747,8 @@ def main():
                 st.session_state.current_day = "day1"
 
         current_day = st.session_state.current_day
+        if current_day:
+            load_progress_days([current_day])
 
         # Create sidebar
         create_progress_sidebar(all_days, day_to_content, current_day, student_s3_prefix)
@@ -1185,6 +1762,8 @@ def main():
                     
                     # Start day screen
                     if not st.session_state.day_started:
+                        # The opening audio and first pages load while the student reads this
+                        prefetch_page_audio(content, student_s3_prefix, current_day, 0, opening=True)
                         st.markdown(f"""
                         <div style="text-align: center; padding: 50px;">
                             <h1 style="color: #4ECDC4; margin-bottom: 30px;">
@@ -1216,14 +1795,16 @@ def main():
                     st.subheader(content.get('theme', current_day))
                     
                     # Prepare questions
-                    all_questions = []
-                    for activity in content.get('activities', []):
-                        for idx, q in enumerate(activity.get('questions', [])):
-                            all_questions.append((activity, idx, q))
+                    all_questions = day_questions(content)
                    
-                    questions_per_page = 2
+                    questions_per_page = QUESTIONS_PER_PAGE
                     total_pages = (len(all_questions) + questions_per_page - 1) // questions_per_page
                     page = st.session_state.question_page
+                    prefetch_page_audio(content, student_s3_prefix, current_day, page)
+                    
+                    # Warm the next day while the student finishes this one
+                    if page + 1 >= total_pages:
+                        prefetch_next_day(day_to_content, current_day)
 
                     # Navigation at top
                     st.markdown("---")
@@ -1243,12 +1824,13 @@ def main():
                         current_questions = all_questions[start_idx:end_idx]
                         
                         current_page_answered = all(
-                            st.session_state.answers.get(f"answer_{current_day}_{start_idx + i}")
+                            get_answer(current_day, start_idx + i)
                             for i in range(len(current_questions))
                         )
                         
                         if current_page_answered and page + 1 < total_pages:
                             if st.button("Next ➡️", key="next_top", type="primary", use_container_width=True):
+                                flush_progress()
                                 st.session_state.question_page += 1
                                 st.session_state.audio_containers = {}
                                 scroll_to_top()
@@ -1266,7 +1848,7 @@ def main():
                                     if transition_audio:
                                         audio_key = fix_audio_path(transition_audio, student_s3_prefix, current_day)
                                         if audio_key:
-                                            play_audio_hidden(audio_key, f"transition_{page}")
+                                            play_audio_hidden(audio_key)
                                             st.session_state.transition_audio_played.add(transition_key)
                                     break
 
@@ -1298,7 +1880,7 @@ def main():
                                     intro_container = st.container()
                                     with intro_container:
                                         if st.button("🎯 Activity Introduction", key=f"intro_{activity.get('activity_number')}_{page}", use_container_width=True):
-                                            play_audio_hidden(tutor_audio_key, f"intro_{activity.get('activity_number')}_{page}_{time.time()}")
+                                            play_audio_hidden(tutor_audio_key)
                             
                             # Teaching and practice buttons
                             col1, col2 = st.columns(2)
@@ -1309,7 +1891,7 @@ def main():
                                     teaching_audio_key = fix_audio_path(teaching_audio, student_s3_prefix, current_day)
                                     if teaching_audio_key:
                                         if st.button("📖 Teach Me", key=f"teach_{activity.get('activity_number')}_{page}", use_container_width=True, type="primary"):
-                                            play_audio_hidden(teaching_audio_key, f"teach_{activity.get('activity_number')}_{page}_{time.time()}")
+                                            play_audio_hidden(teaching_audio_key)
                             
                             with col2:
                                 multisensory_audio = activity.get('multisensory_audio', '')
@@ -1318,7 +1900,7 @@ def main():
                                     multi_clicked_key = f"multi_clicked_{current_day}_{activity.get('activity_number')}"
                                     
                                     if st.button("🤹 Multisensory Practice", key=f"multi_{activity.get('activity_number')}_{page}", use_container_width=True, type="secondary"):
-                                        play_audio_hidden(multisensory_audio_key, f"multi_{activity.get('activity_number')}_{page}_{time.time()}")
+                                        play_audio_hidden(multisensory_audio_key)
                                         # Mark that multisensory was clicked
                                         st.session_state[multi_clicked_key] = True
                             
@@ -1385,14 +1967,15 @@ def main():
                             audio_s3_key = fix_audio_path(q_audio, student_s3_prefix, current_day)
                             if audio_s3_key:
                                 if st.button(f"🔊 Play Question", key=f"q_{global_idx}_{page}"):
-                                    play_audio_hidden(audio_s3_key, f"q_{global_idx}_{page}")
+                                    play_audio_hidden(audio_s3_key)
 
+                        # Widget key for the text answer inputs
                         answer_key = f"answer_{current_day}_{global_idx}"
                         
                         # Handle answer types
                         if q.get('answer_type') == 'single_select':
                             options = q.get('options', [])
-                            current_answer = st.session_state.answers.get(answer_key)
+                            current_answer = get_answer(current_day, global_idx)
                             
                             # Show feedback
                             feedback_key = f"feedback_{current_day}_{global_idx}"
@@ -1412,7 +1995,7 @@ def main():
                                     if feedback_data.get('feedback_audio') and not st.session_state.get(fb_played_key, False):
                                         feedback_audio_key = fix_audio_path(feedback_data['feedback_audio'], student_s3_prefix, current_day)
                                         if feedback_audio_key:
-                                            play_audio_hidden(feedback_audio_key, f"fb_{global_idx}_{time.time()}")
+                                            play_audio_hidden(feedback_audio_key)
                                             st.session_state[fb_played_key] = True
                                 else:
                                     st.warning("❌ Try again!")
@@ -1425,7 +2008,7 @@ def main():
                                 with col1:
                                     button_label = f"{'✓ ' if current_answer == label else ''}{label}"
                                     if st.button(button_label, key=f"opt_{global_idx}_{opt_idx}_{page}"):
-                                        st.session_state.answers[answer_key] = label
+                                        set_answer(current_day, global_idx, label)
                                         st.session_state[feedback_key] = {
                                             'selected': label,
                                             'correct': q.get('correct_answer', ''),
@@ -1433,7 +2016,7 @@ def main():
                                             'show_time': time.time()
                                         }
                                         # Save answer immediately
-                                        update_progress_data(current_day, {answer_key: label})
+                                        update_progress_data(current_day, {global_idx: label})
                                         st.rerun()
                                 
                                 with col2:
@@ -1442,7 +2025,7 @@ def main():
                                         audio_s3_key = fix_audio_path(opt_audio, student_s3_prefix, current_day)
                                         if audio_s3_key:
                                             if st.button("🔊", key=f"opt_audio_{global_idx}_{opt_idx}_{page}"):
-                                                play_audio_hidden(audio_s3_key, f"opt_audio_{global_idx}_{opt_idx}_{page}_{time.time()}")
+                                                play_audio_hidden(audio_s3_key)
 
                         elif q.get('answer_type') == 'text_input':
                             if q.get('question_type') == 'text_input_dictation':
@@ -1455,24 +2038,24 @@ def main():
                                             st.info("📝 Click play to hear the sentence")
                                         with col2:
                                             if st.button("▶️ Play", key=f"dict_{global_idx}_{page}", type="primary"):
-                                                play_audio_hidden(dictation_key, f"dict_{global_idx}_{page}_{time.time()}")
+                                                play_audio_hidden(dictation_key)
                                 
                                 # Add attempt tracking
                                 attempt_key = f"dictation_attempts_{global_idx}_{page}"
                                 if attempt_key not in st.session_state:
                                     st.session_state[attempt_key] = 0
                                 
-                                current_answer = st.text_input("Your Answer:", key=answer_key, value=st.session_state.answers.get(answer_key, ""))
+                                current_answer = st.text_input("Your Answer:", key=answer_key, value=get_answer(current_day, global_idx, ""))
                                 
                                 if current_answer and not current_answer.startswith("[Shown:"):
                                     is_valid, message = is_valid_dictation_answer(current_answer, q.get('correct_answer', ''))
                                     
                                     if is_valid or current_answer.lower() == "i don't know":
-                                        st.session_state.answers[answer_key] = current_answer
+                                        set_answer(current_day, global_idx, current_answer)
                                         # Reset attempts on success
                                         st.session_state[attempt_key] = 0
                                         # Save answer immediately
-                                        update_progress_data(current_day, {answer_key: current_answer})
+                                        update_progress_data(current_day, {global_idx: current_answer})
                                         st.success(message if current_answer.lower() != "i don't know" else "That's okay!")
                                     else:
                                         # Increment attempts
@@ -1484,8 +2067,8 @@ def main():
                                             st.warning(f"The correct answer is: **{correct_answer}**")
                                             st.info("Let's continue to the next question!")
                                             # Auto-save "shown answer" to allow progression
-                                            st.session_state.answers[answer_key] = f"[Shown: {correct_answer}]"
-                                            update_progress_data(current_day, {answer_key: f"[Shown: {correct_answer}]"})
+                                            set_answer(current_day, global_idx, f"[Shown: {correct_answer}]")
+                                            update_progress_data(current_day, {global_idx: f"[Shown: {correct_answer}]"})
                                             # Reset attempts
                                             st.session_state[attempt_key] = 0
                                             st.rerun()
@@ -1496,19 +2079,19 @@ def main():
                                     st.success("Answer recorded. Let's continue!")
                             else:
                                 # Regular text input (e.g., reading comprehension)
-                                current_answer = st.text_input("Your Answer:", key=answer_key, value=st.session_state.answers.get(answer_key, ""))
+                                current_answer = st.text_input("Your Answer:", key=answer_key, value=get_answer(current_day, global_idx, ""))
                                 
                                 if current_answer:
-                                    st.session_state.answers[answer_key] = current_answer
+                                    set_answer(current_day, global_idx, current_answer)
                                     # Save answer immediately
-                                    update_progress_data(current_day, {answer_key: current_answer})
+                                    update_progress_data(current_day, {global_idx: current_answer})
                                     st.success("Answer saved!")
                         
                         # Paragraph writing final display - UPDATED WITH COMPARISON
                         if activity.get('component') == 'Paragraph Writing':
                             activity_questions = [q for q in activity.get('questions', [])]
                             all_activity_answered = all(
-                                st.session_state.answers.get(f"answer_{current_day}_{all_questions.index((activity, j, q))}")
+                                get_answer(current_day, all_questions.index((activity, j, q)))
                                 for j, q in enumerate(activity_questions)
                             )
                             
@@ -1518,8 +2101,7 @@ def main():
                                 # Assemble student's paragraph from their choices
                                 student_paragraph_parts = []
                                 for j, q in enumerate(activity_questions):
-                                    answer_key = f"answer_{current_day}_{all_questions.index((activity, j, q))}"
-                                    student_answer = st.session_state.answers.get(answer_key, "")
+                                    student_answer = get_answer(current_day, all_questions.index((activity, j, q)), "")
                                     if student_answer:
                                         # Extract just the sentence part if it includes both sentences
                                         sentences = student_answer.split('. ')
@@ -1609,7 +2191,7 @@ def main():
                                     if para_key:
                                         st.markdown("---")
                                         if st.button("🎧 Listen to Model Paragraph", key=f"para_{activity.get('activity_number')}_{page}", use_container_width=True):
-                                            play_audio_hidden(para_key, f"para_{activity.get('activity_number')}_{page}_{time.time()}")
+                                            play_audio_hidden(para_key)
                         
                         if i < len(current_questions) - 1:
                             st.divider()
@@ -1631,8 +2213,7 @@ def main():
                     # Check if all answered
                     all_answered = True
                     for i in range(len(current_questions)):
-                        answer_key = f"answer_{current_day}_{start_idx + i}"
-                        user_answer = st.session_state.answers.get(answer_key)
+                        user_answer = get_answer(current_day, start_idx + i)
                         _, _, q = current_questions[i]
                         
                         if q.get('answer_type') == 'single_select':
@@ -1670,6 +2251,7 @@ def main():
                         if all_answered:
                             if page + 1 < total_pages:
                                 if st.button("Next ➡️", key="next_bottom", type="primary", use_container_width=True):
+                                    flush_progress()
                                     st.session_state.question_page += 1
                                     st.session_state.audio_containers = {}
                                     scroll_to_top()
@@ -1679,7 +2261,10 @@ def main():
                                 if st.button("✅ Complete Day", key="complete_day", type="primary", use_container_width=True):
                                     st.session_state.completed_days.add(current_day)
                                     # Mark day as completed in progress
-                                    update_progress_data(current_day, st.session_state.answers, completed=True)
+                                    update_progress_data(
+                                        current_day, _day_answers(current_day, st.session_state.answers),
+                                        completed=True, score=score_day(current_day, day_data)
+                                    )
                                     
                                     current_index = all_days.index(current_day)
                                     
@@ -1692,12 +2277,12 @@ def main():
                                         st.session_state.audio_containers = {}
                                         st.session_state.transition_audio_played = set()
                                         st.session_state.practice_done = {}
-                                        # Save the new current day
-                                        update_progress_data(next_day, {})
-                                        st.success(f"Great job! Moving to {next_day}...")
-                                        time.sleep(1)
+                                        # Save the completed day and the new current day together
+                                        update_progress_data(next_day, {}, flush=True)
+                                        st.toast(f"Great job! Moving to {next_day}...")
                                         st.rerun()
                                     else:
+                                        flush_progress()
                                         show_success_animation("All activities completed! 🎉")
                                         st.balloons()
                     